@@ -13,3 +13,79 @@ VAPID_EMAIL = os.getenv("VAPID_EMAIL")
 API_KEY = os.getenv("API_KEY")
 
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "").split(",")
+
+# "supabase" or "sqlite"
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "push_service.db")
+# Subscription metadata keys that get an index in SQLite, comma separated
+SQLITE_METADATA_INDEX_KEYS = [key.strip() for key in os.getenv("SQLITE_METADATA_INDEX_KEYS", "spaceId").split(",") if key.strip()]
+
+PUSH_MAX_CONCURRENCY = int(os.getenv("PUSH_MAX_CONCURRENCY", "200"))
+PUSH_MAX_CONCURRENCY_PER_HOST = int(os.getenv("PUSH_MAX_CONCURRENCY_PER_HOST", "50"))
+
+PUSH_HTTP2 = os.getenv("PUSH_HTTP2", "true").lower() == "true"
+PUSH_POOL_MAX_CONNECTIONS = int(os.getenv("PUSH_POOL_MAX_CONNECTIONS", "20"))
+PUSH_POOL_KEEPALIVE_EXPIRY = float(os.getenv("PUSH_POOL_KEEPALIVE_EXPIRY", "120"))
+PUSH_REQUEST_TIMEOUT = float(os.getenv("PUSH_REQUEST_TIMEOUT", "10"))
+# Sends per second per push service origin (0 disables the limiter)
+PUSH_RATE_LIMIT_PER_HOST = float(os.getenv("PUSH_RATE_LIMIT_PER_HOST", "1000"))
+PUSH_RATE_LIMIT_BURST = int(os.getenv("PUSH_RATE_LIMIT_BURST", "200"))
+PUSH_MAX_RETRIES = int(os.getenv("PUSH_MAX_RETRIES", "3"))
+PUSH_RETRY_BASE_DELAY = float(os.getenv("PUSH_RETRY_BASE_DELAY", "0.5"))
+PUSH_RETRY_MAX_DELAY = float(os.getenv("PUSH_RETRY_MAX_DELAY", "60"))
+# Retry waits up to this long happen in the caller; longer ones are handed to the retry scheduler
+PUSH_RETRY_INLINE_MAX_DELAY = float(os.getenv("PUSH_RETRY_INLINE_MAX_DELAY", "1"))
+# Where payload encryption runs: "inline" (event loop), "thread" or "process" pool
+PUSH_ENCRYPTION_EXECUTOR = os.getenv("PUSH_ENCRYPTION_EXECUTOR", "inline")
+PUSH_ENCRYPTION_WORKERS = int(os.getenv("PUSH_ENCRYPTION_WORKERS", "0")) or None
+
+SUBSCRIPTION_CACHE_SIZE = int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "100000"))
+SUBSCRIPTION_CACHE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_TTL", "300"))
+
+LOG_SINK_QUEUE_SIZE = int(os.getenv("LOG_SINK_QUEUE_SIZE", "10000"))
+LOG_SINK_BATCH_SIZE = int(os.getenv("LOG_SINK_BATCH_SIZE", "500"))
+LOG_SINK_FLUSH_INTERVAL = float(os.getenv("LOG_SINK_FLUSH_INTERVAL", "1.0"))
+LOG_SINK_OVERFLOW_POLICY = os.getenv("LOG_SINK_OVERFLOW_POLICY", "drop")
+LOG_SINK_SAMPLE_RATE = float(os.getenv("LOG_SINK_SAMPLE_RATE", "0.1"))
+# Share of high-volume per-device rows (e.g. push successes) kept, as "level=rate" or "level:source=rate" pairs
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "debug=0.01,info=0.01")
+# Identical errors within this many seconds are written once plus one row with the repeat count; 0 disables
+LOG_ERROR_DEDUPE_WINDOW = float(os.getenv("LOG_ERROR_DEDUPE_WINDOW", "60"))
+
+LOG_STATS_RETENTION_HOURS = int(os.getenv("LOG_STATS_RETENTION_HOURS", "168"))
+LOG_PAGE_MAX_LIMIT = int(os.getenv("LOG_PAGE_MAX_LIMIT", "1000"))
+LOG_EXPORT_PAGE_SIZE = int(os.getenv("LOG_EXPORT_PAGE_SIZE", "1000"))
+
+NOTIFY_JOB_WORKERS = int(os.getenv("NOTIFY_JOB_WORKERS", "4"))
+NOTIFY_JOB_QUEUE_SIZE = int(os.getenv("NOTIFY_JOB_QUEUE_SIZE", "1000"))
+NOTIFY_JOB_STORE = os.getenv("NOTIFY_JOB_STORE", "memory")
+NOTIFY_JOB_HISTORY_SIZE = int(os.getenv("NOTIFY_JOB_HISTORY_SIZE", "1000"))
+# With the database store, processes refresh a heartbeat on the jobs they own; jobs whose
+# heartbeat is older than the lease are taken over by another process
+NOTIFY_JOB_HEARTBEAT_INTERVAL = float(os.getenv("NOTIFY_JOB_HEARTBEAT_INTERVAL", "10"))
+NOTIFY_JOB_LEASE_SECONDS = float(os.getenv("NOTIFY_JOB_LEASE_SECONDS", "60"))
+# Due scheduled notifications are released into the job queue at this rate (schedules per second)
+NOTIFY_SCHEDULE_RELEASE_RATE = float(os.getenv("NOTIFY_SCHEDULE_RELEASE_RATE", "10"))
+NOTIFY_SCHEDULE_RELEASE_BURST = int(os.getenv("NOTIFY_SCHEDULE_RELEASE_BURST", "10"))
+# Furthest ahead a notification can be scheduled, in seconds
+NOTIFY_SCHEDULE_MAX_DELAY = float(os.getenv("NOTIFY_SCHEDULE_MAX_DELAY", str(30 * 24 * 3600)))
+
+BROADCAST_PAGE_SIZE = int(os.getenv("BROADCAST_PAGE_SIZE", "1000"))
+BROADCAST_MAX_IN_FLIGHT = int(os.getenv("BROADCAST_MAX_IN_FLIGHT", "1000"))
+# Seconds a tagged notification is held so a newer one for the same endpoint and tag can replace it; 0 disables
+NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW", "0"))
+# Devices looked up and sent per chunk when /notify streams its results
+NOTIFY_STREAM_CHUNK_SIZE = int(os.getenv("NOTIFY_STREAM_CHUNK_SIZE", "1000"))
+
+# Sending this header with a truthy value attaches a sampling profile to a sync /notify or /broadcast response
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+# Opt-in: a profile samples every thread and its response exposes source file names and line numbers
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "50"))
+
+SUBSCRIBE_BULK_MAX_ITEMS = int(os.getenv("SUBSCRIBE_BULK_MAX_ITEMS", "10000"))
+SUBSCRIBE_BULK_CHUNK_SIZE = int(os.getenv("SUBSCRIBE_BULK_CHUNK_SIZE", "500"))
+
+SUBSCRIPTION_PRUNING = os.getenv("SUBSCRIPTION_PRUNING", "true").lower() == "true"
+SUBSCRIPTION_PRUNE_BATCH_SIZE = int(os.getenv("SUBSCRIPTION_PRUNE_BATCH_SIZE", "500"))
@@ -1,9 +1,63 @@
 class DatabaseBackend:
-    def add_subscription(self, subscription):
+    async def connect(self):
+        """Open connections at startup; optional"""
+
+    async def close(self):
+        """Release connections at shutdown; optional"""
+
+    async def add_subscription(self, subscription):
+        raise NotImplementedError
+
+    async def remove_subscriptions(self, device_ids):
+        raise NotImplementedError
+
+    async def get_subscriptions(self, metadata_filter=None):
+        raise NotImplementedError
+
+    async def get_subscriptions_by_device_ids(self, device_ids):
+        raise NotImplementedError
+
+    async def insert_logs(self, log_entries):
+        raise NotImplementedError
+
+    async def get_logs(self, filters=None, since=None, before=None, limit=100):
+        raise NotImplementedError
+
+    async def save_job(self, job_record):
+        raise NotImplementedError
+
+    async def get_job(self, job_id):
+        raise NotImplementedError
+
+    async def get_jobs_by_status(self, statuses):
         raise NotImplementedError
 
-    def remove_subscription(self, endpoint):
+    async def get_subscriptions_page(self, metadata_filter=None, after_id=None, limit=1000):
         raise NotImplementedError
 
-    def get_subscriptions(self, space_id=None):
-        raise NotImplementedError 
\ No newline at end of file
+    async def remove_subscriptions_by_ids(self, subscription_ids):
+        raise NotImplementedError
+
+    async def add_subscriptions(self, subscription_requests):
+        raise NotImplementedError
+
+    async def save_scheduled_notification(self, schedule_record):
+        raise NotImplementedError
+
+    async def get_scheduled_notification(self, schedule_id):
+        raise NotImplementedError
+
+    async def get_scheduled_notifications(self, statuses, limit=None):
+        raise NotImplementedError
+
+    async def update_scheduled_notification(self, schedule_id, expected_status, updates):
+        raise NotImplementedError
+
+    async def update_job(self, job_id, expected, updates):
+        raise NotImplementedError
+
+    async def add_log_rollups(self, rows, expire_before):
+        raise NotImplementedError
+
+    async def get_log_rollup_totals(self, since):
+        raise NotImplementedError
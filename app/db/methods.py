@@ -1,14 +1,148 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
+import asyncio
+import functools
+import time
+from app.config import DATABASE_BACKEND
+from app.db.base import DatabaseBackend
 from app.db.supabase import SupabaseDatabase
+from app.db.sqlite import SqliteDatabase
 from app.models.subscription import SubscriptionRequest
+from app.utils.metrics import db_query_duration, db_query_errors
+from app.utils.timings import timed_phase
 
-db = SupabaseDatabase()
+DATABASE_BACKENDS = {
+    "supabase": SupabaseDatabase,
+    "sqlite": SqliteDatabase,
+}
 
-def add_subscription(subscription: SubscriptionRequest) -> List[Dict[str, Any]]:
-    return db.add_subscription(subscription)
+def create_database(backend: str = DATABASE_BACKEND) -> DatabaseBackend:
+    if backend not in DATABASE_BACKENDS:
+        raise ValueError(f"Unknown DATABASE_BACKEND '{backend}', expected one of: {', '.join(DATABASE_BACKENDS)}")
+    return DATABASE_BACKENDS[backend]()
 
-def remove_subscriptions(device_ids: List[str]) -> List[Dict[str, Any]]:
-    return db.remove_subscriptions(device_ids)
+db = create_database()
 
-def get_subscriptions(metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-    return db.get_subscriptions(metadata_filter) 
\ No newline at end of file
+def timed(fn):
+    """Record latency and failures of a database call under its method name"""
+    method = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            db_query_errors.inc(method)
+            raise
+        finally:
+            db_query_duration.observe(time.perf_counter() - started, method)
+    return wrapper
+
+async def connect_database():
+    await db.connect()
+
+async def close_database():
+    await db.close()
+
+@timed
+async def add_subscription(subscription: SubscriptionRequest) -> List[Dict[str, Any]]:
+    return await db.add_subscription(subscription)
+
+@timed
+async def add_subscriptions(subscription_requests: List[SubscriptionRequest]) -> List[Dict[str, Any]]:
+    return await db.add_subscriptions(subscription_requests)
+
+@timed
+async def remove_subscriptions(device_ids: List[str]) -> List[Dict[str, Any]]:
+    return await db.remove_subscriptions(device_ids)
+
+@timed
+async def remove_subscriptions_by_ids(subscription_ids: List[Any]) -> List[Dict[str, Any]]:
+    return await db.remove_subscriptions_by_ids(subscription_ids)
+
+@timed
+async def get_subscriptions(metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    return await db.get_subscriptions(metadata_filter)
+
+@timed
+async def get_subscriptions_page(metadata_filter: Optional[Dict[str, Any]] = None,
+                                 after_id: Optional[Any] = None,
+                                 limit: int = 1000) -> List[Dict[str, Any]]:
+    return await db.get_subscriptions_page(metadata_filter, after_id, limit)
+
+async def iter_subscriptions(metadata_filter: Optional[Dict[str, Any]] = None, page_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+    """Stream matching subscriptions page by page; the next page is fetched while the current one is consumed"""
+    with timed_phase("subscription_lookup"):
+        page = await get_subscriptions_page(metadata_filter, None, page_size)
+    while page:
+        next_page = None
+        if len(page) == page_size:
+            next_page = asyncio.ensure_future(get_subscriptions_page(metadata_filter, page[-1]["id"], page_size))
+        try:
+            for subscription in page:
+                yield subscription
+        except BaseException:
+            # Consumer stopped early; don't leave the prefetch running
+            if next_page is not None:
+                next_page.cancel()
+            raise
+        # Only the time spent blocked on the prefetch counts towards the lookup phase
+        with timed_phase("subscription_lookup"):
+            page = await next_page if next_page is not None else []
+
+@timed
+async def get_subscriptions_by_device_ids(device_ids: List[str]) -> List[Dict[str, Any]]:
+    return await db.get_subscriptions_by_device_ids(device_ids)
+
+@timed
+async def insert_logs(log_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return await db.insert_logs(log_entries)
+
+@timed
+async def get_logs(filters: Optional[Dict[str, Any]] = None,
+                   since: Optional[str] = None,
+                   before: Optional[Tuple[str, Any]] = None,
+                   limit: int = 100) -> List[Dict[str, Any]]:
+    return await db.get_logs(filters, since, before, limit)
+
+@timed
+async def save_job(job_record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return await db.save_job(job_record)
+
+@timed
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return await db.get_job(job_id)
+
+@timed
+async def update_job(job_id: str, expected: Dict[str, Any], updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return await db.update_job(job_id, expected, updates)
+
+@timed
+async def get_jobs_by_status(statuses: List[str]) -> List[Dict[str, Any]]:
+    return await db.get_jobs_by_status(statuses)
+
+@timed
+async def save_scheduled_notification(schedule_record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return await db.save_scheduled_notification(schedule_record)
+
+@timed
+async def get_scheduled_notification(schedule_id: str) -> Optional[Dict[str, Any]]:
+    return await db.get_scheduled_notification(schedule_id)
+
+@timed
+async def get_scheduled_notifications(statuses: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return await db.get_scheduled_notifications(statuses, limit)
+
+@timed
+async def update_scheduled_notification(schedule_id: str,
+                                        expected_status: str,
+                                        updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return await db.update_scheduled_notification(schedule_id, expected_status, updates)
+
+@timed
+async def add_log_rollups(rows: List[Dict[str, Any]], expire_before: str) -> None:
+    return await db.add_log_rollups(rows, expire_before)
+
+@timed
+async def get_log_rollup_totals(since: str) -> List[Dict[str, Any]]:
+    return await db.get_log_rollup_totals(since)
@@ -0,0 +1,487 @@
+from typing import List, Optional, Dict, Any, Tuple, Iterable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import re
+import sqlite3
+from app.config import SQLITE_PATH, SQLITE_METADATA_INDEX_KEYS
+from app.db.base import DatabaseBackend
+from app.models.subscription import SubscriptionRequest
+
+# Stays under SQLite's host parameter limit for `IN (...)` lists
+SQLITE_CHUNK_SIZE = 500
+
+# Metadata keys that are safe to inline into a json_extract path, which lets queries use the expression indexes
+SIMPLE_KEY = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+SUBSCRIPTION_JSON_COLUMNS = ("keys", "metadata")
+LOG_COLUMNS = ("level", "message", "source", "client_id", "user_agent", "ip_address", "metadata", "timestamp")
+JOB_COLUMNS = ("id", "device_ids", "payload", "metadata_filter", "status", "processed", "summary", "error",
+               "created_at", "started_at", "finished_at", "owner", "heartbeat_at")
+JOB_JSON_COLUMNS = ("device_ids", "payload", "metadata_filter", "summary")
+SCHEDULE_COLUMNS = ("id", "device_ids", "payload", "send_at", "status", "job_id", "created_at", "updated_at")
+SCHEDULE_JSON_COLUMNS = ("device_ids", "payload")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL UNIQUE,
+    keys TEXT NOT NULL,
+    expiration_time TEXT,
+    metadata TEXT,
+    device_id TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_device_id ON subscriptions (device_id);
+
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL,
+    source TEXT NOT NULL,
+    client_id TEXT,
+    user_agent TEXT,
+    ip_address TEXT,
+    metadata TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_logs_level ON logs (level, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_logs_source ON logs (source, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_logs_client_id ON logs (client_id, timestamp, id);
+
+CREATE TABLE IF NOT EXISTS notification_jobs (
+    id TEXT PRIMARY KEY,
+    device_ids TEXT,
+    payload TEXT,
+    metadata_filter TEXT,
+    status TEXT NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    summary TEXT,
+    error TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    owner TEXT,
+    heartbeat_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notification_jobs_status ON notification_jobs (status, created_at);
+
+CREATE TABLE IF NOT EXISTS scheduled_notifications (
+    id TEXT PRIMARY KEY,
+    device_ids TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    send_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    job_id TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_notifications_status ON scheduled_notifications (status, send_at);
+
+CREATE TABLE IF NOT EXISTS log_rollups (
+    minute TEXT NOT NULL,
+    level TEXT NOT NULL,
+    source TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (minute, level, source)
+);
+"""
+
+def _metadata_path(key: str) -> str:
+    return f'$."{key}"'
+
+def _dumps(value: Any) -> Optional[str]:
+    return json.dumps(value) if value is not None else None
+
+def _decode(row: sqlite3.Row, json_columns: Iterable[str]) -> Dict[str, Any]:
+    record = dict(row)
+    for column in json_columns:
+        if record.get(column) is not None:
+            record[column] = json.loads(record[column])
+    return record
+
+def _decode_log(row: sqlite3.Row) -> Dict[str, Any]:
+    """Log row with its id as a string, the type LogResponse.log_id and the Supabase backend use"""
+    record = _decode(row, ("metadata",))
+    record["id"] = str(record["id"])
+    return record
+
+def _chunks(values: List[Any]) -> Iterable[List[Any]]:
+    for start in range(0, len(values), SQLITE_CHUNK_SIZE):
+        yield values[start:start + SQLITE_CHUNK_SIZE]
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+class SqliteDatabase(DatabaseBackend):
+    """DatabaseBackend on a local SQLite file in WAL mode.
+    All queries run on one dedicated thread so the event loop never blocks on disk I/O."""
+
+    def __init__(self, path: str = SQLITE_PATH, metadata_index_keys: Iterable[str] = SQLITE_METADATA_INDEX_KEYS):
+        self.path = path
+        self.metadata_index_keys = [key for key in metadata_index_keys if SIMPLE_KEY.match(key)]
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        connection.executescript(SCHEMA)
+        # Columns added after the table was first created
+        job_columns = {row["name"] for row in connection.execute("PRAGMA table_info(notification_jobs)")}
+        for column in ("owner", "heartbeat_at"):
+            if column not in job_columns:
+                connection.execute(f"ALTER TABLE notification_jobs ADD COLUMN {column} TEXT")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_notification_jobs_heartbeat ON notification_jobs (status, heartbeat_at)"
+        )
+        for key in self.metadata_index_keys:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_subscriptions_metadata_{key.replace('-', '_')} "
+                f"ON subscriptions (json_extract(metadata, '{_metadata_path(key)}'))"
+            )
+        return connection
+
+    def _call(self, fn, args):
+        if self._connection is None:
+            self._connection = self._open()
+        return fn(self._connection, *args)
+
+    async def _run(self, fn, *args):
+        """Run `fn(connection, *args)` on the database thread"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    async def connect(self):
+        """Open the database file and create missing tables and indexes"""
+        await self._run(lambda connection: None)
+
+    async def close(self):
+        if self._executor is None:
+            return
+        if self._connection is not None:
+            await self._run(lambda connection: connection.close())
+            self._connection = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def _metadata_conditions(self, metadata_filter: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any]]:
+        """WHERE clauses matching each metadata key; scalar values compare equal, objects and lists by JSON text"""
+        conditions, params = [], []
+        for key, value in (metadata_filter or {}).items():
+            if SIMPLE_KEY.match(key):
+                expression = f"json_extract(metadata, '{_metadata_path(key)}')"
+            else:
+                expression = "json_extract(metadata, ?)"
+                params.append(_metadata_path(key))
+            if isinstance(value, (dict, list)):
+                conditions.append(f"{expression} = json(?)")
+                params.append(json.dumps(value))
+            else:
+                conditions.append(f"{expression} = ?")
+                params.append(value)
+        return conditions, params
+
+    async def add_subscription(self, subscription_request: SubscriptionRequest) -> List[Dict[str, Any]]:
+        return await self.add_subscriptions([subscription_request])
+
+    async def add_subscriptions(self, subscription_requests: List[SubscriptionRequest]) -> List[Dict[str, Any]]:
+        """Upsert many subscriptions with multi-row statements in one transaction"""
+        rows = [
+            (
+                request.subscription.endpoint,
+                json.dumps(request.subscription.keys.model_dump()),
+                request.subscription.expiration_time,
+                _dumps(request.subscription.metadata),
+                request.device_id,
+            )
+            for request in subscription_requests
+        ]
+        rows_per_statement = SQLITE_CHUNK_SIZE // 5
+
+        def upsert(connection: sqlite3.Connection):
+            upserted = []
+            with connection:
+                for start in range(0, len(rows), rows_per_statement):
+                    chunk = rows[start:start + rows_per_statement]
+                    result = connection.execute(
+                        "INSERT INTO subscriptions (endpoint, keys, expiration_time, metadata, device_id) VALUES "
+                        f"{', '.join(['(?, ?, ?, ?, ?)'] * len(chunk))} "
+                        "ON CONFLICT (endpoint) DO UPDATE SET keys = excluded.keys, expiration_time = excluded.expiration_time, "
+                        "metadata = excluded.metadata, device_id = excluded.device_id RETURNING *",
+                        [value for row in chunk for value in row]
+                    ).fetchall()
+                    upserted.extend(_decode(row, SUBSCRIPTION_JSON_COLUMNS) for row in result)
+            return upserted
+
+        return await self._run(upsert)
+
+    async def _delete_subscriptions(self, column: str, values: List[Any]) -> List[Dict[str, Any]]:
+        def delete(connection: sqlite3.Connection):
+            deleted = []
+            with connection:
+                for chunk in _chunks(list(values)):
+                    rows = connection.execute(
+                        f"DELETE FROM subscriptions WHERE {column} IN ({_placeholders(len(chunk))}) RETURNING *",
+                        chunk
+                    ).fetchall()
+                    deleted.extend(_decode(row, SUBSCRIPTION_JSON_COLUMNS) for row in rows)
+            return deleted
+
+        return await self._run(delete)
+
+    async def remove_subscriptions(self, device_ids: List[str]) -> List[Dict[str, Any]]:
+        """Remove subscriptions for multiple device IDs"""
+        return await self._delete_subscriptions("device_id", device_ids)
+
+    async def remove_subscriptions_by_ids(self, subscription_ids: List[Any]) -> List[Dict[str, Any]]:
+        """Remove individual subscription rows, e.g. endpoints the push service reported as gone"""
+        return await self._delete_subscriptions("id", subscription_ids)
+
+    async def get_subscriptions(self, metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        conditions, params = self._metadata_conditions(metadata_filter)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def select(connection: sqlite3.Connection):
+            rows = connection.execute(f"SELECT * FROM subscriptions{where}", params).fetchall()
+            return [_decode(row, SUBSCRIPTION_JSON_COLUMNS) for row in rows]
+
+        return await self._run(select)
+
+    async def get_subscriptions_page(self,
+                                     metadata_filter: Optional[Dict[str, Any]] = None,
+                                     after_id: Optional[Any] = None,
+                                     limit: int = 1000) -> List[Dict[str, Any]]:
+        """One page of subscriptions matching `metadata_filter`, ordered by id after `after_id`"""
+        conditions, params = self._metadata_conditions(metadata_filter)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def select(connection: sqlite3.Connection):
+            rows = connection.execute(f"SELECT * FROM subscriptions{where} ORDER BY id LIMIT ?", [*params, limit]).fetchall()
+            return [_decode(row, SUBSCRIPTION_JSON_COLUMNS) for row in rows]
+
+        return await self._run(select)
+
+    async def get_subscriptions_by_device_ids(self, device_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch only the subscriptions for the given device IDs, chunking large lists"""
+        def select(connection: sqlite3.Connection):
+            subscriptions = []
+            for chunk in _chunks(list(device_ids)):
+                rows = connection.execute(
+                    f"SELECT * FROM subscriptions WHERE device_id IN ({_placeholders(len(chunk))})",
+                    chunk
+                ).fetchall()
+                subscriptions.extend(_decode(row, SUBSCRIPTION_JSON_COLUMNS) for row in rows)
+            return subscriptions
+
+        return await self._run(select)
+
+    async def insert_logs(self, log_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert log rows with multi-row inserts in one transaction"""
+        rows = [
+            [_dumps(entry.get(column)) if column == "metadata" else entry.get(column) for column in LOG_COLUMNS]
+            for entry in log_entries
+        ]
+        # Keep each statement's parameter count well under SQLite's limit
+        rows_per_statement = SQLITE_CHUNK_SIZE // len(LOG_COLUMNS)
+
+        def insert(connection: sqlite3.Connection):
+            inserted = []
+            row_placeholders = f"({_placeholders(len(LOG_COLUMNS))})"
+            with connection:
+                for start in range(0, len(rows), rows_per_statement):
+                    chunk = rows[start:start + rows_per_statement]
+                    result = connection.execute(
+                        f"INSERT INTO logs ({', '.join(LOG_COLUMNS)}) VALUES "
+                        f"{', '.join([row_placeholders] * len(chunk))} RETURNING *",
+                        [value for row in chunk for value in row]
+                    ).fetchall()
+                    inserted.extend(_decode_log(row) for row in result)
+            return inserted
+
+        return await self._run(insert)
+
+    async def get_logs(self,
+                       filters: Optional[Dict[str, Any]] = None,
+                       since: Optional[str] = None,
+                       before: Optional[Tuple[str, Any]] = None,
+                       limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest-first page of logs matching equality `filters`.
+        `before` is the (timestamp, id) keyset cursor of the last row of the previous page."""
+        conditions, params = [], []
+        for column, value in (filters or {}).items():
+            if column not in LOG_COLUMNS:
+                raise ValueError(f"Unknown log column '{column}'")
+            conditions.append(f"{column} = ?")
+            params.append(value)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if before:
+            timestamp, log_id = before
+            conditions.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([timestamp, timestamp, log_id])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def select(connection: sqlite3.Connection):
+            rows = connection.execute(
+                f"SELECT * FROM logs{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                [*params, limit]
+            ).fetchall()
+            return [_decode_log(row) for row in rows]
+
+        return await self._run(select)
+
+    async def save_job(self, job_record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Insert or update a notification job row"""
+        params = [
+            _dumps(job_record.get(column)) if column in JOB_JSON_COLUMNS else job_record.get(column)
+            for column in JOB_COLUMNS
+        ]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in JOB_COLUMNS if column != "id")
+
+        def upsert(connection: sqlite3.Connection):
+            with connection:
+                rows = connection.execute(
+                    f"INSERT INTO notification_jobs ({', '.join(JOB_COLUMNS)}) VALUES ({_placeholders(len(JOB_COLUMNS))}) "
+                    f"ON CONFLICT (id) DO UPDATE SET {updates} RETURNING *",
+                    params
+                ).fetchall()
+            return [_decode(row, JOB_JSON_COLUMNS) for row in rows]
+
+        return await self._run(upsert)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        def select(connection: sqlite3.Connection):
+            row = connection.execute("SELECT * FROM notification_jobs WHERE id = ?", (job_id,)).fetchone()
+            return _decode(row, JOB_JSON_COLUMNS) if row else None
+
+        return await self._run(select)
+
+    async def update_job(self, job_id: str, expected: Dict[str, Any], updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply `updates` only if the job's columns still equal `expected` (None matches NULL); None otherwise"""
+        for column in [*expected, *updates]:
+            if column not in JOB_COLUMNS:
+                raise ValueError(f"Unknown job column '{column}'")
+        assignments = ", ".join(f"{column} = ?" for column in updates)
+        params = [_dumps(value) if column in JOB_JSON_COLUMNS else value for column, value in updates.items()]
+        conditions = ["id = ?"]
+        params.append(job_id)
+        for column, value in expected.items():
+            if value is None:
+                conditions.append(f"{column} IS NULL")
+            else:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        def update(connection: sqlite3.Connection):
+            with connection:
+                row = connection.execute(
+                    f"UPDATE notification_jobs SET {assignments} WHERE {' AND '.join(conditions)} RETURNING *",
+                    params
+                ).fetchone()
+            return _decode(row, JOB_JSON_COLUMNS) if row else None
+
+        return await self._run(update)
+
+    async def get_jobs_by_status(self, statuses: List[str]) -> List[Dict[str, Any]]:
+        def select(connection: sqlite3.Connection):
+            rows = connection.execute(
+                f"SELECT * FROM notification_jobs WHERE status IN ({_placeholders(len(statuses))}) ORDER BY created_at",
+                list(statuses)
+            ).fetchall()
+            return [_decode(row, JOB_JSON_COLUMNS) for row in rows]
+
+        return await self._run(select)
+
+    async def save_scheduled_notification(self, schedule_record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        params = [
+            _dumps(schedule_record.get(column)) if column in SCHEDULE_JSON_COLUMNS else schedule_record.get(column)
+            for column in SCHEDULE_COLUMNS
+        ]
+
+        def insert(connection: sqlite3.Connection):
+            with connection:
+                rows = connection.execute(
+                    f"INSERT INTO scheduled_notifications ({', '.join(SCHEDULE_COLUMNS)}) "
+                    f"VALUES ({_placeholders(len(SCHEDULE_COLUMNS))}) RETURNING *",
+                    params
+                ).fetchall()
+            return [_decode(row, SCHEDULE_JSON_COLUMNS) for row in rows]
+
+        return await self._run(insert)
+
+    async def get_scheduled_notification(self, schedule_id: str) -> Optional[Dict[str, Any]]:
+        def select(connection: sqlite3.Connection):
+            row = connection.execute("SELECT * FROM scheduled_notifications WHERE id = ?", (schedule_id,)).fetchone()
+            return _decode(row, SCHEDULE_JSON_COLUMNS) if row else None
+
+        return await self._run(select)
+
+    async def get_scheduled_notifications(self, statuses: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Schedules in the given statuses, earliest send_at first"""
+        def select(connection: sqlite3.Connection):
+            sql = f"SELECT * FROM scheduled_notifications WHERE status IN ({_placeholders(len(statuses))}) ORDER BY send_at"
+            params = list(statuses)
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            return [_decode(row, SCHEDULE_JSON_COLUMNS) for row in connection.execute(sql, params).fetchall()]
+
+        return await self._run(select)
+
+    async def update_scheduled_notification(self,
+                                            schedule_id: str,
+                                            expected_status: str,
+                                            updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply `updates` only if the schedule is still in `expected_status`; None otherwise"""
+        columns = [column for column in updates if column in SCHEDULE_COLUMNS and column != "id"]
+        params = [
+            _dumps(updates[column]) if column in SCHEDULE_JSON_COLUMNS else updates[column]
+            for column in columns
+        ]
+
+        def update(connection: sqlite3.Connection):
+            with connection:
+                row = connection.execute(
+                    f"UPDATE scheduled_notifications SET {', '.join(f'{column} = ?' for column in columns)} "
+                    "WHERE id = ? AND status = ? RETURNING *",
+                    params + [schedule_id, expected_status]
+                ).fetchone()
+            return _decode(row, SCHEDULE_JSON_COLUMNS) if row else None
+
+        return await self._run(update)
+
+    async def add_log_rollups(self, rows: List[Dict[str, Any]], expire_before: str) -> None:
+        """Add per-minute counts to the log_rollups table and drop minutes before `expire_before`"""
+        params = [(row["minute"], row["level"], row["source"], row["count"]) for row in rows]
+
+        def upsert(connection: sqlite3.Connection):
+            with connection:
+                connection.executemany(
+                    "INSERT INTO log_rollups (minute, level, source, count) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (minute, level, source) DO UPDATE SET count = count + excluded.count",
+                    params
+                )
+                connection.execute("DELETE FROM log_rollups WHERE minute < ?", (expire_before,))
+
+        await self._run(upsert)
+
+    async def get_log_rollup_totals(self, since: str) -> List[Dict[str, Any]]:
+        """Summed counts per level and source for minutes starting at or after `since`"""
+        def select(connection: sqlite3.Connection):
+            rows = connection.execute(
+                "SELECT level, source, SUM(count) AS count FROM log_rollups WHERE minute >= ? GROUP BY level, source",
+                (since,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+        return await self._run(select)
@@ -1,36 +1,177 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
 from app.db.base import DatabaseBackend
-from app.dependencies import get_supabase_client
+from app.dependencies import get_async_supabase_client, close_supabase_client
 from app.models.subscription import SubscriptionRequest, UnsubscribeRequest, Subscription
 
+# Keeps the `in.(...)` filter well inside PostgREST's URL length limits
+DEVICE_ID_CHUNK_SIZE = 200
+
 class SupabaseDatabase(DatabaseBackend):
-    def __init__(self):
-        self.supabase = get_supabase_client()
+    """DatabaseBackend on the shared async Supabase client; queries never block the event loop"""
+    
+    async def connect(self):
+        await get_async_supabase_client()
+
+    async def close(self):
+        await close_supabase_client()
     
-    def add_subscription(self, subscription_request: SubscriptionRequest) -> List[Dict[str, Any]]:
-        subscription = subscription_request.subscription
-        data = {
-            "endpoint": subscription.endpoint,
-            "keys": subscription.keys.model_dump(),
-            "expiration_time": subscription.expiration_time,
-            "metadata": subscription.metadata,
-            "device_id": subscription_request.device_id,
-        }
-        result = self.supabase.table("subscriptions").upsert(
-            data,
+    async def add_subscription(self, subscription_request: SubscriptionRequest) -> List[Dict[str, Any]]:
+        return await self.add_subscriptions([subscription_request])
+
+    async def add_subscriptions(self, subscription_requests: List[SubscriptionRequest]) -> List[Dict[str, Any]]:
+        """Upsert many subscriptions with one multi-row statement; endpoints must be unique within the list"""
+        rows = [
+            {
+                "endpoint": request.subscription.endpoint,
+                "keys": request.subscription.keys.model_dump(),
+                "expiration_time": request.subscription.expiration_time,
+                "metadata": request.subscription.metadata,
+                "device_id": request.device_id,
+            }
+            for request in subscription_requests
+        ]
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("subscriptions").upsert(
+            rows,
             on_conflict="endpoint"
         ).execute()
         return result.data
 
-    def remove_subscriptions(self, device_ids: List[str]) -> List[Dict[str, Any]]:
+    async def remove_subscriptions(self, device_ids: List[str]) -> List[Dict[str, Any]]:
         """Remove subscriptions for multiple device IDs"""
-        result = self.supabase.table("subscriptions").delete().in_("device_id", device_ids).execute()
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("subscriptions").delete().in_("device_id", device_ids).execute()
         return result.data
 
-    def get_subscriptions(self, metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        query = self.supabase.table("subscriptions").select("*")
+    async def remove_subscriptions_by_ids(self, subscription_ids: List[Any]) -> List[Dict[str, Any]]:
+        """Remove individual subscription rows, e.g. endpoints the push service reported as gone"""
+        supabase = await get_async_supabase_client()
+        results = await asyncio.gather(*(
+            supabase.table("subscriptions").delete().in_("id", subscription_ids[start:start + DEVICE_ID_CHUNK_SIZE]).execute()
+            for start in range(0, len(subscription_ids), DEVICE_ID_CHUNK_SIZE)
+        ))
+        return [row for result in results for row in result.data]
+
+    async def get_subscriptions(self, metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        supabase = await get_async_supabase_client()
+        query = supabase.table("subscriptions").select("*")
         if metadata_filter:
             for key, value in metadata_filter.items():
                 query = query.contains("metadata", {key: value})
-        result = query.execute()
-        return result.data 
\ No newline at end of file
+        result = await query.execute()
+        return result.data
+
+    async def get_subscriptions_page(self,
+                                     metadata_filter: Optional[Dict[str, Any]] = None,
+                                     after_id: Optional[Any] = None,
+                                     limit: int = 1000) -> List[Dict[str, Any]]:
+        """One page of subscriptions matching `metadata_filter`, ordered by id after `after_id`"""
+        supabase = await get_async_supabase_client()
+        query = supabase.table("subscriptions").select("*")
+        for key, value in (metadata_filter or {}).items():
+            query = query.contains("metadata", {key: value})
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        result = await query.order("id").limit(limit).execute()
+        return result.data
+
+    async def get_subscriptions_by_device_ids(self, device_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch only the subscriptions for the given device IDs, chunking large lists"""
+        supabase = await get_async_supabase_client()
+        results = await asyncio.gather(*(
+            supabase.table("subscriptions").select("*").in_("device_id", device_ids[start:start + DEVICE_ID_CHUNK_SIZE]).execute()
+            for start in range(0, len(device_ids), DEVICE_ID_CHUNK_SIZE)
+        ))
+        return [row for result in results for row in result.data]
+
+    async def insert_logs(self, log_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert log rows with a single multi-row insert"""
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("logs").insert(log_entries).execute()
+        return result.data
+
+    async def get_logs(self,
+                       filters: Optional[Dict[str, Any]] = None,
+                       since: Optional[str] = None,
+                       before: Optional[Tuple[str, Any]] = None,
+                       limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest-first page of logs matching equality `filters`.
+        `before` is the (timestamp, id) keyset cursor of the last row of the previous page."""
+        supabase = await get_async_supabase_client()
+        query = supabase.table("logs").select("*")
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        if since:
+            query = query.gte("timestamp", since)
+        if before:
+            timestamp, log_id = before
+            query = query.or_(f'timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt."{log_id}")')
+        result = await query.order("timestamp", desc=True).order("id", desc=True).limit(limit).execute()
+        return result.data
+
+    async def save_job(self, job_record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Insert or update a notification job row"""
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("notification_jobs").upsert(job_record, on_conflict="id").execute()
+        return result.data
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("notification_jobs").select("*").eq("id", job_id).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def update_job(self, job_id: str, expected: Dict[str, Any], updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply `updates` only if the job's columns still equal `expected` (None matches NULL); None otherwise"""
+        supabase = await get_async_supabase_client()
+        query = supabase.table("notification_jobs").update(updates).eq("id", job_id)
+        for column, value in expected.items():
+            query = query.is_(column, "null") if value is None else query.eq(column, value)
+        result = await query.execute()
+        return result.data[0] if result.data else None
+
+    async def get_jobs_by_status(self, statuses: List[str]) -> List[Dict[str, Any]]:
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("notification_jobs").select("*").in_("status", statuses).order("created_at").execute()
+        return result.data
+
+    async def save_scheduled_notification(self, schedule_record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("scheduled_notifications").insert(schedule_record).execute()
+        return result.data
+
+    async def get_scheduled_notification(self, schedule_id: str) -> Optional[Dict[str, Any]]:
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("scheduled_notifications").select("*").eq("id", schedule_id).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def get_scheduled_notifications(self, statuses: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Schedules in the given statuses, earliest send_at first"""
+        supabase = await get_async_supabase_client()
+        query = supabase.table("scheduled_notifications").select("*").in_("status", statuses).order("send_at")
+        if limit is not None:
+            query = query.limit(limit)
+        result = await query.execute()
+        return result.data
+
+    async def update_scheduled_notification(self,
+                                            schedule_id: str,
+                                            expected_status: str,
+                                            updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply `updates` only if the schedule is still in `expected_status`; None otherwise.
+        The status check happens in the same statement, so two processes cannot both claim a schedule."""
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("scheduled_notifications").update(updates).eq("id", schedule_id).eq("status", expected_status).execute()
+        return result.data[0] if result.data else None
+
+    async def add_log_rollups(self, rows: List[Dict[str, Any]], expire_before: str) -> None:
+        """Add per-minute counts to the log_rollups table and drop minutes before `expire_before`.
+        Counts are incremented in the database (see LOGGING.md), so concurrent workers never overwrite each other."""
+        supabase = await get_async_supabase_client()
+        await supabase.rpc("add_log_rollups", {"rows": rows, "expire_before": expire_before}).execute()
+
+    async def get_log_rollup_totals(self, since: str) -> List[Dict[str, Any]]:
+        """Summed counts per level and source for minutes starting at or after `since`"""
+        supabase = await get_async_supabase_client()
+        result = await supabase.rpc("log_rollup_totals", {"since": since}).execute()
+        return result.data
@@ -1,6 +1,9 @@
 from fastapi import Header, HTTPException, Request
 from app.config import API_KEY, ALLOWED_ORIGINS, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
-from supabase import create_client
+from supabase import acreate_client, AsyncClient
+
+# One client per process, reusing its pooled HTTP connections for every query
+_async_supabase_client: AsyncClient = None
 
 async def verify_api_key(request: Request, x_api_key: str = Header(default=None)):
     expected_key = API_KEY
@@ -16,5 +19,16 @@ async def verify_api_key(request: Request, x_api_key: str = Header(default=None)
         detail="Forbidden: Invalid API key or origin not allowed"
     )
 
-def get_supabase_client():
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
\ No newline at end of file
+async def get_async_supabase_client() -> AsyncClient:
+    """Shared async client. Created in the app lifespan, or on first use outside the app"""
+    global _async_supabase_client
+    if _async_supabase_client is None:
+        _async_supabase_client = await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _async_supabase_client
+
+async def close_supabase_client():
+    """Release the shared client's connections on shutdown"""
+    global _async_supabase_client
+    if _async_supabase_client is not None:
+        await _async_supabase_client.postgrest.aclose()
+        _async_supabase_client = None
@@ -2,6 +2,7 @@ from fastapi import Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from app.utils.payload import PayloadTooLargeError
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     return JSONResponse(
@@ -14,6 +15,13 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     )
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    # An oversized notification payload is a size problem, not a malformed request
+    for err in exc.errors():
+        if isinstance(err.get("ctx", {}).get("error"), PayloadTooLargeError):
+            return JSONResponse(
+                status_code=413,
+                content={"status_code": 413, "message": str(err["ctx"]["error"]), "error": "Payload too large"},
+            )
     return JSONResponse(
         status_code=400,
         content={
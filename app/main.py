@@ -1,14 +1,35 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from app.routers import subscriptions, notifications, logs
+from app.routers import subscriptions, notifications, logs, stats, metrics
 from app.exceptions import http_exception_handler, validation_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
+from app.services.webpush_service import start_encryption_executor, close_encryption_executor, close_web_push_sender
+from app.utils.logger import logger
+from app.db.methods import connect_database, close_database
+from app.services.notification_jobs import notification_jobs
+from app.services.notification_scheduler import notification_scheduler
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_database()
+    logger.sink.start()
+    start_encryption_executor()
+    await notification_jobs.start()
+    await notification_scheduler.start()
+    yield
+    await notification_scheduler.close()
+    await notification_jobs.close()
+    await close_web_push_sender()
+    close_encryption_executor()
+    await logger.close()
+    await close_database()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +37,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
@@ -24,6 +46,8 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.include_router(subscriptions.router)
 app.include_router(notifications.router)
 app.include_router(logs.router)
+app.include_router(stats.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
@@ -1,7 +1,19 @@
-from pydantic import BaseModel
-from typing import Optional, List, Union
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Union, Dict, Any
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from app.models.subscription import Subscription
+from app.utils.payload import render_payload
+from app.config import NOTIFY_SCHEDULE_MAX_DELAY
+
+class NotifyMode(str, Enum):
+    SYNC = "sync"
+    ASYNC = "async"
+    STREAM = "stream"
+
+class ResultsMode(str, Enum):
+    ALL = "all"
+    FAILURES = "failures"
 
 class NotificationDirection(str, Enum):
     AUTO = "auto"
@@ -34,6 +46,41 @@ class NotificationPayload(BaseModel):
     dir: Optional[NotificationDirection] = None
     data: Optional[NotificationData] = None
 
+    @model_validator(mode="after")
+    def check_size(self):
+        """Reject payloads over the Web Push size limit before any send is attempted"""
+        render_payload(self.to_dict())
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready payload without unset (None) fields"""
+        return self.model_dump(mode="json", exclude_none=True)
+
 class NotificationRequest(BaseModel):
     payload: NotificationPayload
-    device_ids: List[str]  
\ No newline at end of file
+    device_ids: List[str]
+    # Schedule the batch instead of sending it now: an absolute time, or seconds from now
+    send_at: Optional[datetime] = None
+    delay: Optional[float] = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def check_schedule(self):
+        if self.send_at is not None and self.delay is not None:
+            raise ValueError("Pass either send_at or delay, not both")
+        if self.send_at is not None and self.send_at.tzinfo is None:
+            # Naive times are UTC, like every timestamp the service stores
+            self.send_at = self.send_at.replace(tzinfo=timezone.utc)
+        scheduled_for = self.scheduled_for()
+        if scheduled_for is not None and scheduled_for - datetime.now(timezone.utc) > timedelta(seconds=NOTIFY_SCHEDULE_MAX_DELAY):
+            raise ValueError(f"Notifications can be scheduled at most {int(NOTIFY_SCHEDULE_MAX_DELAY)} seconds ahead")
+        return self
+
+    def scheduled_for(self) -> Optional[datetime]:
+        """When to send, or None to send right away"""
+        if self.delay is not None:
+            return datetime.now(timezone.utc) + timedelta(seconds=self.delay)
+        return self.send_at
+
+class BroadcastRequest(BaseModel):
+    payload: NotificationPayload
+    metadata_filter: Dict[str, Any] = Field(..., min_length=1)
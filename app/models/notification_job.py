@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from enum import Enum
+from typing import Optional, List, Dict, Any
+import uuid
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+@dataclass
+class NotificationJob:
+    device_ids: List[str]
+    payload: Dict[str, Any]
+    # Set for broadcast jobs, which target subscriptions by metadata instead of device_ids
+    metadata_filter: Optional[Dict[str, Any]] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: JobStatus = JobStatus.QUEUED
+    processed: int = 0
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    # Process that queued or runs the job, and when it last confirmed it is alive
+    owner: Optional[str] = None
+    heartbeat_at: Optional[str] = None
+
+    @property
+    def is_broadcast(self) -> bool:
+        return self.metadata_filter is not None
+
+    @property
+    def total(self) -> Optional[int]:
+        """Number of devices to notify; unknown up front for broadcasts"""
+        return None if self.is_broadcast else len(self.device_ids)
+
+    def to_record(self) -> Dict[str, Any]:
+        """Row stored by the job store"""
+        record = asdict(self)
+        record["status"] = self.status.value
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "NotificationJob":
+        fields = {key: record.get(key) for key in cls.__dataclass_fields__ if key in record}
+        fields["status"] = JobStatus(fields.get("status") or JobStatus.QUEUED)
+        return cls(**fields)
+
+    def to_status(self) -> Dict[str, Any]:
+        """Public view returned by the job status endpoint"""
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "metadata_filter": self.metadata_filter,
+            "total": self.total,
+            "processed": self.processed,
+            "summary": self.summary,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
@@ -1,8 +1,12 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class NotificationResult:
     device_id: str
     success: bool
-    error: Optional[str] = None 
\ No newline at end of file
+    error: Optional[str] = None
+    # Not sent because a newer notification with the same tag replaced it
+    superseded: bool = False
+    # Not delivered yet: waiting in the push retry scheduler after a throttled or failed attempt
+    retry_scheduled: bool = False
@@ -0,0 +1,48 @@
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from enum import Enum
+from typing import Optional, List, Dict, Any
+import uuid
+
+class ScheduleStatus(str, Enum):
+    SCHEDULED = "scheduled"
+    RELEASED = "released"
+    CANCELLED = "cancelled"
+
+@dataclass
+class ScheduledNotification:
+    device_ids: List[str]
+    payload: Dict[str, Any]
+    # Naive UTC ISO timestamp, like the other timestamps stored by the service
+    send_at: str
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: ScheduleStatus = ScheduleStatus.SCHEDULED
+    # Notification job the schedule was released into
+    job_id: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    updated_at: Optional[str] = None
+
+    def to_record(self) -> Dict[str, Any]:
+        """Row stored through the DatabaseBackend"""
+        record = asdict(self)
+        record["status"] = self.status.value
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "ScheduledNotification":
+        fields = {key: record.get(key) for key in cls.__dataclass_fields__ if key in record}
+        fields["status"] = ScheduleStatus(fields.get("status") or ScheduleStatus.SCHEDULED)
+        return cls(**fields)
+
+    def to_status(self) -> Dict[str, Any]:
+        """Public view returned by the schedule endpoints"""
+        return {
+            "schedule_id": self.id,
+            "status": self.status.value,
+            "send_at": self.send_at,
+            "device_count": len(self.device_ids or []),
+            "payload_title": (self.payload or {}).get("title"),
+            "job_id": self.job_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
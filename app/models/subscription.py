@@ -1,5 +1,6 @@
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from app.config import SUBSCRIBE_BULK_MAX_ITEMS
 
 class Keys(BaseModel):
     p256dh: str
@@ -16,5 +17,8 @@ class SubscriptionRequest(BaseModel):
     device_id: str
 
 class UnsubscribeRequest(BaseModel):
-    device_ids: List[str]  
+    device_ids: List[str]
 
+class BulkSubscribeRequest(BaseModel):
+    # Items are validated one by one so a bad item is reported instead of failing the whole batch
+    subscriptions: List[Dict[str, Any]] = Field(..., min_length=1, max_length=SUBSCRIBE_BULK_MAX_ITEMS)
@@ -1,10 +1,15 @@
-from fastapi import Request, HTTPException, Query
-from typing import Optional, List
+from fastapi import Request, Response, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Dict, Any
+import json
 from datetime import datetime, timedelta
 from app.models.log import LogEntry, LogResponse, LogLevel, LogSource
 from app.utils.logger import logger
-from app.dependencies import get_supabase_client
+from app.config import LOG_PAGE_MAX_LIMIT, LOG_EXPORT_PAGE_SIZE
+from app.db.methods import get_logs as db_get_logs
+from app.utils.pagination import encode_cursor, decode_cursor
 from app.utils.router import create_logger_router
+from app.utils.log_rollups import log_rollups
 
 router = create_logger_router()
 
@@ -35,7 +40,8 @@ async def create_log(log_entry: LogEntry, request: Request):
             client_id=log_entry.client_id,
             user_agent=log_entry.user_agent,
             ip_address=log_entry.ip_address,
-            metadata=log_entry.metadata
+            metadata=log_entry.metadata,
+            wait=True
         )
         
         return LogResponse(
@@ -49,77 +55,105 @@ async def create_log(log_entry: LogEntry, request: Request):
         await logger.error(f"Failed to create log entry: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create log entry")
 
+def _build_log_filters(level: Optional[LogLevel], source: Optional[LogSource], client_id: Optional[str]) -> Dict[str, Any]:
+    filters = {}
+    if level:
+        filters["level"] = level.value
+    if source:
+        filters["source"] = source.value
+    if client_id:
+        filters["client_id"] = client_id
+    return filters
+
+def _since(hours: Optional[int]) -> Optional[str]:
+    return (datetime.utcnow() - timedelta(hours=hours)).isoformat() if hours else None
+
 @router.get("/", response_model=List[dict])
 async def get_logs(
+    response: Response,
     level: Optional[LogLevel] = Query(None, description="Filter by log level"),
     source: Optional[LogSource] = Query(None, description="Filter by log source"),
     client_id: Optional[str] = Query(None, description="Filter by client ID"),
     hours: Optional[int] = Query(24, description="Get logs from last N hours"),
-    limit: Optional[int] = Query(100, description="Maximum number of logs to return")
+    limit: Optional[int] = Query(100, ge=1, le=LOG_PAGE_MAX_LIMIT, description="Maximum number of logs to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page")
 ):
     """
     Retrieve logs with optional filtering. Useful for debugging and monitoring.
+    Results are newest first; when more rows exist, the X-Next-Cursor response header
+    holds the cursor for the next page.
     """
+    before = decode_cursor(cursor) if cursor else None
     try:
-        supabase = get_supabase_client()
-        
-        # Build query
-        query = supabase.table("logs").select("*")
-        
-        # Apply filters
-        if level:
-            query = query.eq("level", level.value)
-        if source:
-            query = query.eq("source", source.value)
-        if client_id:
-            query = query.eq("client_id", client_id)
-        
-        # Time filter
-        if hours:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            query = query.gte("timestamp", cutoff_time.isoformat())
+        rows = await db_get_logs(
+            filters=_build_log_filters(level, source, client_id),
+            since=_since(hours),
+            before=before,
+            limit=limit
+        )
         
-        # Execute query
-        result = query.order("timestamp", desc=True).limit(limit).execute()
+        if len(rows) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
         
-        return result.data if result.data else []
+        return rows
         
     except Exception as e:
         await logger.error(f"Failed to retrieve logs: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve logs")
 
+@router.get("/export")
+async def export_logs(
+    level: Optional[LogLevel] = Query(None, description="Filter by log level"),
+    source: Optional[LogSource] = Query(None, description="Filter by log source"),
+    client_id: Optional[str] = Query(None, description="Filter by client ID"),
+    hours: Optional[int] = Query(24, description="Export logs from last N hours (0 for all)"),
+    cursor: Optional[str] = Query(None, description="Resume an export after this cursor")
+):
+    """
+    Stream matching logs as NDJSON, newest first. Rows are fetched page by page
+    with keyset pagination, so memory use stays bounded however many rows match.
+    """
+    filters = _build_log_filters(level, source, client_id)
+    since = _since(hours)
+    before = decode_cursor(cursor) if cursor else None
+
+    async def stream_rows():
+        nonlocal before
+        while True:
+            try:
+                rows = await db_get_logs(filters=filters, since=since, before=before, limit=LOG_EXPORT_PAGE_SIZE)
+            except Exception as e:
+                await logger.error(f"Log export failed: {str(e)}")
+                # Tell the client where to resume; the status code has already been sent
+                yield json.dumps({"error": "Log export failed", "cursor": encode_cursor(*before) if before else None}) + "\n"
+                return
+            if not rows:
+                return
+            yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+            if len(rows) < LOG_EXPORT_PAGE_SIZE:
+                return
+            before = (rows[-1]["timestamp"], rows[-1]["id"])
+
+    return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
 @router.get("/stats")
-async def get_log_stats():
+async def get_log_stats(
+    hours: Optional[int] = Query(24, ge=0, description="Window size in hours"),
+    minutes: Optional[int] = Query(0, ge=0, description="Additional window minutes")
+):
     """
     Get logging statistics for monitoring and analytics.
+    Answered from the per-minute rollups table, shared by all workers and kept across
+    restarts, so the cost does not grow with the size of the logs table.
     """
     try:
-        supabase = get_supabase_client()
-        
-        # Get stats for the last 24 hours
-        cutoff_time = datetime.utcnow() - timedelta(hours=24)
-        
-        # Count by level
-        level_stats = {}
-        for level in LogLevel:
-            result = supabase.table("logs").select("id", count="exact").eq("level", level.value).gte("timestamp", cutoff_time.isoformat()).execute()
-            level_stats[level.value] = result.count if result.count else 0
-        
-        # Count by source
-        source_stats = {}
-        for source in LogSource:
-            result = supabase.table("logs").select("id", count="exact").eq("source", source.value).gte("timestamp", cutoff_time.isoformat()).execute()
-            source_stats[source.value] = result.count if result.count else 0
-        
-        # Total logs in last 24h
-        total_result = supabase.table("logs").select("id", count="exact").gte("timestamp", cutoff_time.isoformat()).execute()
-        total_logs = total_result.count if total_result.count else 0
+        window = timedelta(hours=hours or 0, minutes=minutes or 0)
+        stats = await log_rollups.get_stats(window)
+        period = f"last_{hours}_hours" if not minutes else f"last_{int(window.total_seconds() // 60)}_minutes"
         
         return {
-            "period": "last_24_hours",
-            "total_logs": total_logs,
-            "by_level": level_stats,
-            "by_source": source_stats,
+            "period": period,
+            **stats,
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.dependencies import verify_api_key
+from app.services.webpush_service import get_web_push_sender
+from app.services.subscription_cache import subscription_cache
+from app.services.subscription_pruner import prune_stats
+from app.services.notification_coalescer import notification_coalescer
+from app.services.notification_jobs import notification_jobs
+from app.services.notification_scheduler import notification_scheduler
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+router = APIRouter(dependencies=[Depends(verify_api_key)])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Pipeline state that already lives in other components is read at scrape time
+metrics.gauge_function(
+    "push_retries_total", "Push sends retried after a 429, 5xx or transport error",
+    lambda: get_web_push_sender().retries, type="counter"
+)
+metrics.gauge_function(
+    "push_retries_exhausted_total", "Push sends that still failed after the last retry",
+    lambda: get_web_push_sender().retries_exhausted, type="counter"
+)
+metrics.gauge_function(
+    "push_pool_connections_opened_total", "New TCP connections per push service origin",
+    lambda: {origin: stats["connections_opened"] for origin, stats in get_web_push_sender().connection_pool.get_stats()["origins"].items()},
+    ["origin"], type="counter"
+)
+metrics.gauge_function(
+    "subscription_cache_size", "Devices in the subscription cache",
+    lambda: subscription_cache.get_stats()["size"]
+)
+metrics.gauge_function(
+    "subscription_cache_hit_ratio", "Subscription cache hits / lookups",
+    lambda: subscription_cache.get_stats()["hit_ratio"]
+)
+metrics.gauge_function(
+    "subscription_cache_lookups_total", "Subscription cache lookups by result",
+    lambda: {"hit": subscription_cache.hits, "miss": subscription_cache.misses},
+    ["result"], type="counter"
+)
+metrics.gauge_function(
+    "subscriptions_pruned_total", "Dead subscriptions marked for deletion by reason",
+    lambda: {"gone": prune_stats.gone, "expired": prune_stats.expired},
+    ["reason"], type="counter"
+)
+metrics.gauge_function(
+    "notifications_superseded_total", "Tagged notifications replaced by a newer one before they were sent",
+    lambda: notification_coalescer.superseded, type="counter"
+)
+metrics.gauge_function(
+    "log_sink_queue_depth", "Log rows waiting to be written",
+    lambda: logger.sink.get_stats()["queue_depth"]
+)
+metrics.gauge_function(
+    "log_sink_rows_total", "Log rows handled by the sink by outcome",
+    lambda: {
+        outcome: logger.sink.get_stats()[outcome]
+        for outcome in ("enqueued", "written", "dropped", "sampled_out", "failed")
+    },
+    ["outcome"], type="counter"
+)
+metrics.gauge_function(
+    "log_rows_suppressed_total", "Log rows not written because they were sampled out or deduplicated",
+    lambda: {"sampled": logger.sampler.sampled_out, "deduplicated": logger.deduplicator.deduplicated},
+    ["reason"], type="counter"
+)
+metrics.gauge_function(
+    "notify_job_queue_depth", "Notification jobs waiting for a worker",
+    lambda: notification_jobs.get_stats()["queue_depth"]
+)
+metrics.gauge_function(
+    "notify_jobs_active", "Notification jobs queued or running in this process",
+    lambda: notification_jobs.get_stats()["active_jobs"]
+)
+metrics.gauge_function(
+    "scheduled_notifications_pending", "Scheduled notifications waiting in this process's timer heap",
+    lambda: notification_scheduler.get_stats()["pending"]
+)
+metrics.gauge_function(
+    "scheduled_notifications_released_total", "Scheduled notifications released into the job queue",
+    lambda: notification_scheduler.released, type="counter"
+)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,21 +1,73 @@
-from fastapi import HTTPException, Request
-from app.models.notification import NotificationRequest
+import asyncio
+import orjson
+from datetime import datetime
+from fastapi import HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+from app.models.notification import NotificationRequest, BroadcastRequest, NotifyMode, ResultsMode
 from app.utils.response import success_response
 from app.utils.router import create_protected_router
 from app.utils.logger import logger
 from app.models.log import LogSource
 from app.services.notification_service import NotificationService
+from app.services.result_processor import NotificationResultProcessor
+from app.services.notification_jobs import notification_jobs
+from app.services.notification_scheduler import notification_scheduler
+from app.models.scheduled_notification import ScheduleStatus
+from app.db.methods import iter_subscriptions
+from app.config import BROADCAST_PAGE_SIZE, PROFILE_HEADER, PROFILING_ENABLED
+from app.utils.profiler import SamplingProfiler
 
 router = create_protected_router()
 
+DEBUG_QUERY = Query(False, description="Include per-phase timings in a `debug` block of the response")
+
+def start_profiler(req: Request) -> Optional[SamplingProfiler]:
+    """Start a sampling profile when the profile header asks for one (and no other profile is running)"""
+    value = req.headers.get(PROFILE_HEADER)
+    if not PROFILING_ENABLED or not value or value.lower() in ("0", "false", "no"):
+        return None
+    profiler = SamplingProfiler()
+    return profiler if profiler.start() else None
+
+def attach_debug(response_data: Dict[str, Any], notification_service: NotificationService, profiler: Optional[SamplingProfiler]):
+    if notification_service.timings is None:
+        return
+    response_data["debug"] = {"timings": notification_service.timings.to_dict()}
+    if profiler is not None:
+        response_data["debug"]["profile"] = profiler.get_profile()
+
 @router.post("/notify")
-async def notify(request: NotificationRequest, req: Request):
+async def notify(
+    request: NotificationRequest,
+    req: Request,
+    response: Response,
+    mode: NotifyMode = Query(NotifyMode.SYNC, description="'async' queues the batch and returns 202 with a job id; "
+                                                          "'stream' returns per-device results as NDJSON as they complete"),
+    results: ResultsMode = Query(ResultsMode.ALL, description="'failures' returns only failed devices plus a count per error message"),
+    debug: bool = DEBUG_QUERY
+):
+    failures_only = results == ResultsMode.FAILURES
+    send_at = request.scheduled_for()
+    if send_at is not None:
+        return await schedule_notification(response, request, send_at)
+    if mode == NotifyMode.ASYNC:
+        return await queue_notification_job(response, request.payload.to_dict(), device_ids=request.device_ids)
+    if mode == NotifyMode.STREAM:
+        return stream_notification(request, req, debug, failures_only)
+    
+    profiler = start_profiler(req)
     try:
-        notification_service = NotificationService()
-        response_data = await notification_service.send_batch_notifications(
-            request.device_ids, 
-            request.payload.model_dump()
-        )
+        notification_service = NotificationService(failures_only=failures_only, collect_timings=debug or profiler is not None)
+        try:
+            response_data = await notification_service.send_batch_notifications(
+                request.device_ids, 
+                request.payload.to_dict()
+            )
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        attach_debug(response_data, notification_service, profiler)
         
         status_code, message = notification_service.result_processor.get_status_code_and_message()
         
@@ -35,4 +87,238 @@ async def notify(request: NotificationRequest, req: Request):
                 "device_count": len(request.device_ids)
             }
         )
-        raise HTTPException(status_code=500, detail=f"Batch notification failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Batch notification failed: {str(e)}")
+
+def stream_notification(request: NotificationRequest, req: Request, debug: bool, failures_only: bool) -> StreamingResponse:
+    """Stream one NDJSON line per device as it finishes, then a summary line.
+    Results are written as they complete instead of being collected, so memory stays
+    bounded and the first line does not wait for the rest of the batch."""
+    async def stream_lines():
+        # Started inside the stream so the profiler is always stopped by the `finally` below
+        profiler = start_profiler(req)
+        notification_service = NotificationService(keep_results=False, collect_timings=debug or profiler is not None)
+        try:
+            async for results in notification_service.stream_batch_notifications(
+                request.device_ids,
+                request.payload.to_dict()
+            ):
+                lines = b"".join(
+                    orjson.dumps(NotificationResultProcessor.format_result(r)) + b"\n"
+                    for r in results
+                    if not (failures_only and r.success)
+                )
+                if lines:
+                    yield lines
+        except Exception as e:
+            await logger.error(
+                f"Batch notification failed: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={
+                    "error_type": type(e).__name__,
+                    "error_details": str(e),
+                    "device_count": len(request.device_ids)
+                }
+            )
+            # The status code has already been sent; the summary tells how far the batch got
+            yield orjson.dumps({
+                "error": f"Batch notification failed: {str(e)}",
+                "summary": notification_service.result_processor.get_summary_data()
+            }) + b"\n"
+            return
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        
+        status_code, message = notification_service.result_processor.get_status_code_and_message()
+        summary_line = {
+            "summary": notification_service.result_processor.get_summary_data(),
+            "status_code": status_code,
+            "message": message
+        }
+        if failures_only:
+            summary_line["errors"] = notification_service.result_processor.error_counts
+        attach_debug(summary_line, notification_service, profiler)
+        yield orjson.dumps(summary_line) + b"\n"
+    
+    return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
+
+async def queue_notification_job(response: Response,
+                                 payload: Dict[str, Any],
+                                 device_ids: Optional[List[str]] = None,
+                                 metadata_filter: Optional[Dict[str, Any]] = None):
+    """Queue a batch or broadcast on the background workers and return its job id"""
+    target = {"device_count": len(device_ids)} if device_ids is not None else {"metadata_filter": metadata_filter}
+    try:
+        job = await notification_jobs.submit(device_ids or [], payload, metadata_filter=metadata_filter)
+    except asyncio.QueueFull:
+        await logger.warn(
+            "Notification job rejected: job queue is full",
+            source=LogSource.SERVICE,
+            metadata=target
+        )
+        raise HTTPException(status_code=503, detail="Notification job queue is full, retry later")
+    except Exception as e:
+        await logger.error(
+            f"Failed to queue notification job: {str(e)}",
+            source=LogSource.SERVICE,
+            metadata={
+                "error_type": type(e).__name__,
+                "error_details": str(e),
+                **target
+            }
+        )
+        raise HTTPException(status_code=500, detail=f"Failed to queue notification job: {str(e)}")
+    
+    await logger.info(
+        f"Queued notification job {job.id}",
+        source=LogSource.SERVICE,
+        metadata={"job_id": job.id, **target}
+    )
+    
+    response.status_code = 202
+    return success_response(
+        data=job.to_status(),
+        message="Notification job queued",
+        status_code=202
+    )
+
+@router.post("/broadcast")
+async def broadcast(
+    request: BroadcastRequest,
+    req: Request,
+    response: Response,
+    mode: NotifyMode = Query(NotifyMode.SYNC, description="'async' queues the broadcast and returns 202 with a job id"),
+    debug: bool = DEBUG_QUERY
+):
+    """Notify every subscription whose metadata matches `metadata_filter`.
+    Subscriptions are paged from the database and streamed into the sender."""
+    if mode == NotifyMode.ASYNC:
+        return await queue_notification_job(response, request.payload.to_dict(), metadata_filter=request.metadata_filter)
+    
+    profiler = start_profiler(req)
+    try:
+        notification_service = NotificationService(keep_results=False, collect_timings=debug or profiler is not None)
+        try:
+            response_data = await notification_service.send_to_subscriptions(
+                iter_subscriptions(request.metadata_filter, BROADCAST_PAGE_SIZE),
+                request.payload.to_dict()
+            )
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        attach_debug(response_data, notification_service, profiler)
+        
+        if notification_service.result_processor.total == 0:
+            return success_response(
+                data=response_data,
+                message="No subscriptions match the metadata filter"
+            )
+        
+        status_code, message = notification_service.result_processor.get_status_code_and_message()
+        
+        return success_response(
+            data=response_data,
+            message=message,
+            status_code=status_code
+        )
+        
+    except Exception as e:
+        await logger.error(
+            f"Broadcast notification failed: {str(e)}",
+            source=LogSource.SERVICE,
+            metadata={
+                "error_type": type(e).__name__,
+                "error_details": str(e),
+                "metadata_filter": request.metadata_filter
+            }
+        )
+        raise HTTPException(status_code=500, detail=f"Broadcast notification failed: {str(e)}")
+
+async def schedule_notification(response: Response, request: NotificationRequest, send_at: datetime):
+    """Persist the batch to be released into the job queue at `send_at`; returns 202 with its schedule id"""
+    try:
+        schedule = await notification_scheduler.schedule(request.device_ids, request.payload.to_dict(), send_at)
+    except Exception as e:
+        await logger.error(
+            f"Failed to schedule notification: {str(e)}",
+            source=LogSource.SERVICE,
+            metadata={
+                "error_type": type(e).__name__,
+                "error_details": str(e),
+                "device_count": len(request.device_ids)
+            }
+        )
+        raise HTTPException(status_code=500, detail=f"Failed to schedule notification: {str(e)}")
+    
+    await logger.info(
+        f"Scheduled notification {schedule.id} for {schedule.send_at}",
+        source=LogSource.SERVICE,
+        metadata={"schedule_id": schedule.id, "send_at": schedule.send_at, "device_count": len(request.device_ids)}
+    )
+    
+    response.status_code = 202
+    return success_response(
+        data=schedule.to_status(),
+        message="Notification scheduled",
+        status_code=202
+    )
+
+@router.get("/notify/scheduled")
+async def list_scheduled_notifications(
+    status: List[ScheduleStatus] = Query([ScheduleStatus.SCHEDULED], description="Statuses to include"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum schedules to return, earliest send_at first")
+):
+    """Scheduled notifications, earliest first"""
+    try:
+        schedules = await notification_scheduler.list_schedules(status, limit)
+    except Exception as e:
+        await logger.error(f"Failed to list scheduled notifications: {str(e)}", source=LogSource.SERVICE)
+        raise HTTPException(status_code=500, detail="Failed to list scheduled notifications")
+    
+    return success_response(
+        data=[schedule.to_status() for schedule in schedules],
+        message=f"Found {len(schedules)} scheduled notifications"
+    )
+
+@router.get("/notify/scheduled/{schedule_id}")
+async def get_scheduled_notification(schedule_id: str):
+    schedule = await notification_scheduler.get(schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Scheduled notification not found")
+    
+    return success_response(
+        data=schedule.to_status(),
+        message=f"Scheduled notification {schedule.status.value}"
+    )
+
+@router.delete("/notify/scheduled/{schedule_id}")
+async def cancel_scheduled_notification(schedule_id: str):
+    """Cancel a scheduled notification that has not been released yet"""
+    schedule = await notification_scheduler.cancel(schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Scheduled notification not found")
+    if schedule.status == ScheduleStatus.RELEASED:
+        raise HTTPException(status_code=409, detail=f"Scheduled notification was already released as job {schedule.job_id}")
+    
+    await logger.info(
+        f"Cancelled scheduled notification {schedule_id}",
+        source=LogSource.SERVICE,
+        metadata={"schedule_id": schedule_id, "send_at": schedule.send_at}
+    )
+    
+    return success_response(
+        data=schedule.to_status(),
+        message="Scheduled notification cancelled"
+    )
+
+@router.get("/notify/jobs/{job_id}")
+async def get_notification_job(job_id: str):
+    """Progress and result summary of a queued notification job"""
+    job = await notification_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Notification job not found")
+    
+    return success_response(
+        data=job.to_status(),
+        message=f"Notification job {job.status.value}"
+    )
@@ -0,0 +1,29 @@
+from app.utils.response import success_response
+from app.utils.router import create_protected_router
+from app.services.webpush_service import get_web_push_sender
+from app.services.subscription_cache import subscription_cache
+from app.services.subscription_pruner import prune_stats
+from app.services.notification_coalescer import notification_coalescer
+from app.utils.logger import logger
+from app.services.notification_jobs import notification_jobs
+from app.services.notification_scheduler import notification_scheduler
+
+router = create_protected_router()
+
+@router.get("/stats")
+async def get_stats():
+    """Runtime statistics for the push sending pipeline"""
+    return success_response(
+        data={
+            "push_pools": get_web_push_sender().connection_pool.get_stats(),
+            "push_sending": get_web_push_sender().get_stats(),
+            "subscription_cache": subscription_cache.get_stats(),
+            "subscription_pruning": prune_stats.get_stats(),
+            "notification_coalescing": notification_coalescer.get_stats(),
+            "log_sink": logger.sink.get_stats(),
+            "log_sampling": {**logger.sampler.get_stats(), **logger.deduplicator.get_stats()},
+            "notification_jobs": notification_jobs.get_stats(),
+            "notification_scheduler": notification_scheduler.get_stats()
+        },
+        message="Stats retrieved successfully"
+    )
@@ -1,10 +1,15 @@
+import asyncio
+from typing import List, Dict, Any
 from fastapi import HTTPException, Request
-from app.db.methods import add_subscription, remove_subscriptions
-from app.models.subscription import SubscriptionRequest, UnsubscribeRequest
+from pydantic import ValidationError
+from app.db.methods import add_subscription, add_subscriptions, remove_subscriptions
+from app.models.subscription import SubscriptionRequest, UnsubscribeRequest, BulkSubscribeRequest
+from app.config import SUBSCRIBE_BULK_CHUNK_SIZE
 from app.utils.response import success_response
 from app.utils.router import create_protected_router
 from app.utils.logger import logger
 from app.models.log import LogSource
+from app.services.subscription_cache import subscription_cache
 
 router = create_protected_router()
 
@@ -21,7 +26,9 @@ async def subscribe(subscription_request: SubscriptionRequest, request: Request)
             }
         )
         
-        result = add_subscription(subscription_request)
+        result = await add_subscription(subscription_request)
+        for row in result:
+            subscription_cache.upsert_subscription(row)
         
         await logger.info(
             "Subscription successful",
@@ -51,6 +58,89 @@ async def subscribe(subscription_request: SubscriptionRequest, request: Request)
         )
         raise HTTPException(status_code=500, detail=f"Subscription failed: {str(e)}")
 
+@router.post("/subscribe/bulk")
+async def subscribe_bulk(bulk_request: BulkSubscribeRequest, request: Request):
+    """Validate and upsert many subscriptions, e.g. when migrating from another system.
+    Returns a result per item; one bad item or failed chunk does not fail the others."""
+    items = bulk_request.subscriptions
+    results: List[Dict[str, Any]] = [{"index": index} for index in range(len(items))]
+    
+    # Validate each item; the last occurrence of an endpoint wins, like sequential upserts would
+    valid: Dict[str, tuple] = {}
+    for index, item in enumerate(items):
+        try:
+            subscription_request = SubscriptionRequest.model_validate(item)
+        except ValidationError as e:
+            results[index].update(status="invalid", error=str(e.errors()[0]["msg"]), loc=e.errors()[0]["loc"])
+            continue
+        endpoint = subscription_request.subscription.endpoint
+        results[index].update(device_id=subscription_request.device_id, endpoint=endpoint)
+        if endpoint in valid:
+            results[valid[endpoint][0]].update(status="duplicate", error=f"Superseded by item {index}")
+        valid[endpoint] = (index, subscription_request)
+    
+    await logger.info(
+        f"Processing bulk subscription request for {len(items)} subscriptions",
+        source=LogSource.SERVICE,
+        metadata={
+            "item_count": len(items),
+            "valid_count": len(valid),
+            "client_ip": request.client.host if request.client else None
+        }
+    )
+    
+    pending = list(valid.values())
+    chunks = [pending[start:start + SUBSCRIBE_BULK_CHUNK_SIZE] for start in range(0, len(pending), SUBSCRIBE_BULK_CHUNK_SIZE)]
+    chunk_results = await asyncio.gather(
+        *(add_subscriptions([subscription_request for _, subscription_request in chunk]) for chunk in chunks),
+        return_exceptions=True
+    )
+    
+    upserted_rows = []
+    for chunk, rows in zip(chunks, chunk_results):
+        if isinstance(rows, Exception):
+            await logger.error(
+                f"Bulk subscription chunk failed: {str(rows)}",
+                source=LogSource.SERVICE,
+                metadata={
+                    "error_type": type(rows).__name__,
+                    "error_details": str(rows),
+                    "chunk_size": len(chunk)
+                }
+            )
+            for index, _ in chunk:
+                results[index].update(status="failed", error=f"Subscription failed: {str(rows)}")
+            continue
+        upserted_rows.extend(rows)
+        for index, _ in chunk:
+            results[index]["status"] = "subscribed"
+    
+    subscription_cache.upsert_subscriptions(upserted_rows)
+    
+    counts = {"total": len(items), "subscribed": 0, "invalid": 0, "duplicate": 0, "failed": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    
+    await logger.info(
+        f"Bulk subscription completed: {counts['subscribed']} subscribed, "
+        f"{counts['total'] - counts['subscribed']} not subscribed",
+        source=LogSource.SERVICE,
+        metadata=counts
+    )
+    
+    if counts["subscribed"] == counts["total"]:
+        status_code, message = 201, "All subscriptions saved"
+    elif counts["subscribed"] == 0:
+        status_code, message = (500 if counts["failed"] else 400), "No subscriptions saved"
+    else:
+        status_code, message = 207, f"{counts['subscribed']} subscriptions saved, {counts['total'] - counts['subscribed']} not saved"
+    
+    return success_response(
+        data={"results": results, "summary": counts},
+        message=message,
+        status_code=status_code
+    )
+
 @router.post("/unsubscribe")
 async def unsubscribe(unsubscribe_request: UnsubscribeRequest, request: Request):
     try:
@@ -64,7 +154,8 @@ async def unsubscribe(unsubscribe_request: UnsubscribeRequest, request: Request)
             }
         )
         
-        result = remove_subscriptions(unsubscribe_request.device_ids)
+        result = await remove_subscriptions(unsubscribe_request.device_ids)
+        subscription_cache.invalidate(unsubscribe_request.device_ids)
         if not result:
             await logger.warn(
                 "Unsubscribe failed: no subscriptions found for provided device IDs",
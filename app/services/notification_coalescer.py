@@ -0,0 +1,56 @@
+import asyncio
+from typing import Dict, Any, Tuple
+from app.config import NOTIFY_COALESCE_WINDOW
+
+class NotificationCoalescer:
+    """Holds tagged notifications for a short window before they are sent.
+
+    Browsers only show the latest notification per tag, so when a newer notification
+    with the same endpoint and tag arrives during the window, it replaces the held one
+    and only the newer one is encrypted and sent. The newer notification keeps the
+    original deadline, so a steady stream still sends at least once per window."""
+
+    def __init__(self, window: float = NOTIFY_COALESCE_WINDOW):
+        self.window = window
+        # (endpoint, tag) -> (waiter of the held notification, send deadline)
+        self._pending: Dict[Tuple[str, str], Tuple[asyncio.Future, float]] = {}
+        self.held = 0
+        self.superseded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def hold(self, endpoint: str, tag: str) -> bool:
+        """Wait until the notification is due; False if a newer one replaced it meanwhile"""
+        loop = asyncio.get_running_loop()
+        key = (endpoint, tag)
+        previous = self._pending.get(key)
+        if previous is not None and not previous[0].done():
+            previous[0].set_result(False)
+            self.superseded += 1
+            deadline = previous[1]
+        else:
+            deadline = loop.time() + self.window
+
+        waiter = loop.create_future()
+        self._pending[key] = (waiter, deadline)
+        self.held += 1
+        handle = loop.call_at(deadline, lambda: waiter.done() or waiter.set_result(True))
+        try:
+            return await waiter
+        finally:
+            handle.cancel()
+            if self._pending.get(key, (None,))[0] is waiter:
+                del self._pending[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window,
+            "pending": len(self._pending),
+            "held": self.held,
+            "superseded": self.superseded,
+        }
+
+# Process-wide, so notifications from separate requests coalesce
+notification_coalescer = NotificationCoalescer()
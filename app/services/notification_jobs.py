@@ -0,0 +1,315 @@
+import asyncio
+import os
+import socket
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from app.config import (
+    NOTIFY_JOB_WORKERS,
+    NOTIFY_JOB_QUEUE_SIZE,
+    NOTIFY_JOB_STORE,
+    NOTIFY_JOB_HISTORY_SIZE,
+    NOTIFY_JOB_HEARTBEAT_INTERVAL,
+    NOTIFY_JOB_LEASE_SECONDS,
+    BROADCAST_PAGE_SIZE,
+)
+from app.db.methods import save_job, get_job, get_jobs_by_status, update_job, iter_subscriptions
+from app.models.log import LogSource
+from app.models.notification_job import NotificationJob, JobStatus
+from app.services.notification_service import NotificationService
+from app.utils.logger import logger
+
+class InMemoryJobStore:
+    """Keeps the most recent jobs in process memory. Jobs do not survive a restart."""
+
+    def __init__(self, history_size: int = NOTIFY_JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, NotificationJob]" = OrderedDict()
+
+    async def save(self, job: NotificationJob):
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        while len(self._jobs) > self.history_size:
+            self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[NotificationJob]:
+        return self._jobs.get(job_id)
+
+    async def get_unfinished(self) -> List[NotificationJob]:
+        return []
+
+    async def claim(self, job: NotificationJob, owner: str, heartbeat_at: str) -> bool:
+        return True
+
+    async def heartbeat(self, jobs: List[NotificationJob], owner: str, heartbeat_at: str) -> List[str]:
+        return []
+
+class DatabaseJobStore:
+    """Persists jobs through the DatabaseBackend so queued and interrupted jobs resume after a restart"""
+
+    async def save(self, job: NotificationJob):
+        await save_job(job.to_record())
+
+    async def get(self, job_id: str) -> Optional[NotificationJob]:
+        record = await get_job(job_id)
+        return NotificationJob.from_record(record) if record else None
+
+    async def get_unfinished(self) -> List[NotificationJob]:
+        records = await get_jobs_by_status([JobStatus.QUEUED.value, JobStatus.RUNNING.value])
+        return [NotificationJob.from_record(record) for record in records]
+
+    async def claim(self, job: NotificationJob, owner: str, heartbeat_at: str) -> bool:
+        """Take over an unfinished job, provided nobody changed it since it was read.
+        The check and the update are one statement, so only one process wins the job."""
+        record = await update_job(
+            job.id,
+            {"status": job.status.value, "heartbeat_at": job.heartbeat_at},
+            {"status": JobStatus.QUEUED.value, "owner": owner, "heartbeat_at": heartbeat_at, "processed": 0}
+        )
+        return record is not None
+
+    async def heartbeat(self, jobs: List[NotificationJob], owner: str, heartbeat_at: str) -> List[str]:
+        """Refresh the lease of jobs still owned by `owner`; returns the ids of jobs another process took over"""
+        records = await asyncio.gather(*(
+            update_job(job.id, {"owner": owner}, {"heartbeat_at": heartbeat_at}) for job in jobs
+        ))
+        return [job.id for job, record in zip(jobs, records) if record is None]
+
+JOB_STORES = {
+    "memory": InMemoryJobStore,
+    "database": DatabaseJobStore,
+}
+
+def lease_expired(job: NotificationJob, lease_seconds: float = NOTIFY_JOB_LEASE_SECONDS) -> bool:
+    """True if the job's owner has not confirmed it is alive within the lease"""
+    if not job.heartbeat_at:
+        return True
+    return (datetime.utcnow() - datetime.fromisoformat(job.heartbeat_at)).total_seconds() > lease_seconds
+
+class NotificationJobManager:
+    """Runs /notify batches in the background on a bounded pool of workers fed by a queue.
+
+    Jobs are owned by the process that queued them, which refreshes their heartbeat while
+    they are queued or running. With a shared (database) store, a job is only resumed by
+    another process once its heartbeat is older than the lease, and only by the one process
+    that wins the claim."""
+
+    def __init__(self, store=None, workers: int = NOTIFY_JOB_WORKERS, queue_size: int = NOTIFY_JOB_QUEUE_SIZE):
+        self.store = store or JOB_STORES[NOTIFY_JOB_STORE]()
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Jobs queued or running in this process, so status reads see live progress
+        self._active: Dict[str, NotificationJob] = {}
+        # Queued jobs another process took over; skipped when they come up
+        self._lost: set = set()
+
+    async def start(self):
+        """Start the workers and resume jobs left unfinished by processes that are gone"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+        await self._resume_orphaned()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def _resume_orphaned(self):
+        """Claim and queue unfinished jobs whose owner stopped heartbeating"""
+        try:
+            unfinished = await self.store.get_unfinished()
+        except Exception as e:
+            await logger.error(
+                f"Failed to load unfinished notification jobs: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={"error_type": type(e).__name__}
+            )
+            return
+        resumed = []
+        for job in unfinished:
+            if job.id in self._active or not lease_expired(job):
+                continue
+            if self._queue.full():
+                break
+            heartbeat_at = datetime.utcnow().isoformat()
+            try:
+                claimed = await self.store.claim(job, self.owner, heartbeat_at)
+            except Exception as e:
+                await logger.error(
+                    f"Failed to claim notification job {job.id}: {str(e)}",
+                    source=LogSource.SERVICE,
+                    metadata={"job_id": job.id, "error_type": type(e).__name__}
+                )
+                continue
+            if not claimed:
+                continue
+            job.status = JobStatus.QUEUED
+            job.processed = 0
+            job.owner = self.owner
+            job.heartbeat_at = heartbeat_at
+            self._active[job.id] = job
+            self._queue.put_nowait(job)
+            resumed.append(job.id)
+        if resumed:
+            await logger.info(
+                f"Resumed {len(resumed)} unfinished notification jobs",
+                source=LogSource.SERVICE,
+                metadata={"job_ids": resumed}
+            )
+
+    async def _heartbeat(self):
+        """Keep the lease of this process's jobs fresh and pick up jobs of processes that died"""
+        while True:
+            await asyncio.sleep(NOTIFY_JOB_HEARTBEAT_INTERVAL)
+            try:
+                jobs = list(self._active.values())
+                heartbeat_at = datetime.utcnow().isoformat()
+                lost = await self.store.heartbeat(jobs, self.owner, heartbeat_at)
+                for job in jobs:
+                    job.heartbeat_at = heartbeat_at
+                for job_id in lost:
+                    self._lost.add(job_id)
+                    await logger.warn(
+                        f"Notification job {job_id} was taken over by another process",
+                        source=LogSource.SERVICE,
+                        metadata={"job_id": job_id, "owner": self.owner}
+                    )
+                await self._resume_orphaned()
+            except Exception as e:
+                await logger.error(
+                    f"Notification job heartbeat failed: {str(e)}",
+                    source=LogSource.SERVICE,
+                    metadata={"error_type": type(e).__name__}
+                )
+
+    async def submit(self,
+                     device_ids: List[str],
+                     payload: Dict[str, Any],
+                     metadata_filter: Optional[Dict[str, Any]] = None) -> NotificationJob:
+        """Queue a batch (or a broadcast when `metadata_filter` is given);
+        raises asyncio.QueueFull when the queue is at capacity"""
+        await self.start()
+        if self._queue.full():
+            raise asyncio.QueueFull()
+        job = NotificationJob(
+            device_ids=device_ids,
+            payload=payload,
+            metadata_filter=metadata_filter,
+            owner=self.owner,
+            heartbeat_at=datetime.utcnow().isoformat()
+        )
+        await self.store.save(job)
+        self._active[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[NotificationJob]:
+        return self._active.get(job_id) or await self.store.get(job_id)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: NotificationJob):
+        if job.id in self._lost:
+            # Another process claimed it after our lease lapsed and runs it instead
+            self._lost.discard(job.id)
+            self._active.pop(job.id, None)
+            return
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.utcnow().isoformat()
+        try:
+            await self.store.save(job)
+
+            def on_result(result):
+                job.processed += 1
+
+            if job.is_broadcast:
+                notification_service = NotificationService(keep_results=False)
+                await notification_service.send_to_subscriptions(
+                    iter_subscriptions(job.metadata_filter, BROADCAST_PAGE_SIZE),
+                    job.payload,
+                    on_result=on_result
+                )
+            else:
+                notification_service = NotificationService()
+                await notification_service.send_batch_notifications(job.device_ids, job.payload, on_result=on_result)
+
+            processor = notification_service.result_processor
+            total, successful, failed = processor.get_summary()
+            status_code, message = processor.get_status_code_and_message()
+            job.summary = {
+                "total": total,
+                "successful": successful,
+                "failed": failed,
+                "status_code": status_code,
+                "message": message,
+            }
+            job.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            # Shutdown mid-batch: leave the job queued and release the lease so the next process resumes it
+            job.status = JobStatus.QUEUED
+            job.heartbeat_at = None
+            raise
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            await logger.error(
+                f"Notification job {job.id} failed: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={
+                    "job_id": job.id,
+                    "error_type": type(e).__name__,
+                    "device_count": job.total
+                }
+            )
+        finally:
+            if job.status != JobStatus.QUEUED:
+                job.finished_at = datetime.utcnow().isoformat()
+            self._active.pop(job.id, None)
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                await logger.error(
+                    f"Failed to save notification job {job.id}: {str(e)}",
+                    source=LogSource.SERVICE,
+                    metadata={"job_id": job.id, "error_type": type(e).__name__}
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.worker_count,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "active_jobs": len(self._active),
+        }
+
+    async def close(self):
+        """Stop the workers. With the database store, interrupted jobs are resumed on next start."""
+        tasks = self._workers + ([self._heartbeat_task] if self._heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat_task = None
+        # Release the lease of jobs that never started, so they can be resumed without waiting for it to expire
+        for job in list(self._active.values()):
+            job.heartbeat_at = None
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                await logger.error(
+                    f"Failed to save notification job {job.id}: {str(e)}",
+                    source=LogSource.SERVICE,
+                    metadata={"job_id": job.id, "error_type": type(e).__name__}
+                )
+        self._active.clear()
+
+# Global job manager instance
+notification_jobs = NotificationJobManager()
@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from app.config import NOTIFY_SCHEDULE_RELEASE_RATE, NOTIFY_SCHEDULE_RELEASE_BURST
+from app.db.methods import (
+    save_scheduled_notification,
+    get_scheduled_notification,
+    get_scheduled_notifications,
+    update_scheduled_notification,
+)
+from app.models.log import LogSource
+from app.models.scheduled_notification import ScheduledNotification, ScheduleStatus
+from app.services.notification_jobs import notification_jobs
+from app.services.rate_limiter import TokenBucket
+from app.utils.logger import logger
+
+# Re-check the clock at least this often, in case wall time jumps while sleeping
+MAX_SLEEP_SECONDS = 60.0
+# Delay before retrying a release that failed, e.g. because the job queue was full
+RELEASE_RETRY_SECONDS = 5.0
+
+def to_epoch(send_at: str) -> float:
+    """Epoch seconds of a stored (naive UTC) send_at timestamp"""
+    parsed = datetime.fromisoformat(send_at)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class NotificationScheduler:
+    """Releases scheduled notifications into the notification job queue when they fall due.
+
+    Schedules are persisted through the DatabaseBackend and reloaded on start, so they
+    survive restarts. In memory only a heap of (send time, id) is kept, and a single timer
+    task sleeps until the earliest entry; device lists and payloads are read back at release.
+    Due schedules pass a token bucket, so many schedules lined up on the same minute are
+    spread out instead of all starting at once."""
+
+    def __init__(self,
+                 release_rate: float = NOTIFY_SCHEDULE_RELEASE_RATE,
+                 release_burst: int = NOTIFY_SCHEDULE_RELEASE_BURST):
+        self._heap: List[Tuple[float, str]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.release_limiter = TokenBucket(release_rate, release_burst)
+        self.scheduled = 0
+        self.released = 0
+        self.cancelled = 0
+        self.release_failures = 0
+
+    async def start(self):
+        """Load pending schedules from the database and start the timer task"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        try:
+            records = await get_scheduled_notifications([ScheduleStatus.SCHEDULED.value])
+        except Exception as e:
+            await logger.error(
+                f"Failed to load scheduled notifications: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={"error_type": type(e).__name__}
+            )
+            records = []
+        for record in records:
+            self._push(to_epoch(record["send_at"]), record["id"])
+        if records:
+            await logger.info(
+                f"Loaded {len(records)} scheduled notifications",
+                source=LogSource.SERVICE,
+                metadata={"schedule_count": len(records)}
+            )
+        self._task = asyncio.create_task(self._run())
+
+    def _push(self, due_at: float, schedule_id: str):
+        heapq.heappush(self._heap, (due_at, schedule_id))
+        if self._heap[0][1] == schedule_id and self._wakeup is not None:
+            # New earliest entry: the timer has to wake up sooner than planned
+            self._wakeup.set()
+
+    async def schedule(self, device_ids: List[str], payload: Dict[str, Any], send_at: datetime) -> ScheduledNotification:
+        """Persist a notification to send at `send_at` (timezone aware)"""
+        await self.start()
+        send_at_utc = send_at.astimezone(timezone.utc).replace(tzinfo=None)
+        schedule = ScheduledNotification(
+            device_ids=device_ids,
+            payload=payload,
+            send_at=send_at_utc.isoformat(timespec="microseconds")
+        )
+        await save_scheduled_notification(schedule.to_record())
+        self._push(to_epoch(schedule.send_at), schedule.id)
+        self.scheduled += 1
+        return schedule
+
+    async def get(self, schedule_id: str) -> Optional[ScheduledNotification]:
+        record = await get_scheduled_notification(schedule_id)
+        return ScheduledNotification.from_record(record) if record else None
+
+    async def list_schedules(self, statuses: List[ScheduleStatus], limit: int) -> List[ScheduledNotification]:
+        records = await get_scheduled_notifications([status.value for status in statuses], limit)
+        return [ScheduledNotification.from_record(record) for record in records]
+
+    async def cancel(self, schedule_id: str) -> Optional[ScheduledNotification]:
+        """Cancel a schedule that has not been released yet.
+        Returns the schedule as it now stands (check its status), or None if it does not exist."""
+        record = await update_scheduled_notification(
+            schedule_id,
+            ScheduleStatus.SCHEDULED.value,
+            {"status": ScheduleStatus.CANCELLED.value, "updated_at": datetime.utcnow().isoformat()}
+        )
+        if record is None:
+            return await self.get(schedule_id)
+        # The heap entry is skipped when it comes due, since it can no longer be claimed
+        self.cancelled += 1
+        return ScheduledNotification.from_record(record)
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due_at, schedule_id = self._heap[0]
+            delay = due_at - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), min(delay, MAX_SLEEP_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            await self.release_limiter.acquire()
+            await self._release(schedule_id)
+
+    async def _release(self, schedule_id: str):
+        """Claim a due schedule and queue it as a notification job"""
+        try:
+            # Only one process can move the schedule out of 'scheduled', so it is sent once
+            record = await update_scheduled_notification(
+                schedule_id,
+                ScheduleStatus.SCHEDULED.value,
+                {"status": ScheduleStatus.RELEASED.value, "updated_at": datetime.utcnow().isoformat()}
+            )
+        except Exception as e:
+            await self._retry_later(schedule_id, e)
+            return
+        if record is None:
+            # Cancelled, or already released by another process
+            return
+
+        schedule = ScheduledNotification.from_record(record)
+        try:
+            job = await notification_jobs.submit(schedule.device_ids, schedule.payload)
+        except Exception as e:
+            try:
+                await update_scheduled_notification(
+                    schedule_id,
+                    ScheduleStatus.RELEASED.value,
+                    {"status": ScheduleStatus.SCHEDULED.value, "updated_at": datetime.utcnow().isoformat()}
+                )
+            except Exception:
+                pass
+            await self._retry_later(schedule_id, e)
+            return
+
+        self.released += 1
+        try:
+            await update_scheduled_notification(schedule_id, ScheduleStatus.RELEASED.value, {"job_id": job.id})
+        except Exception as e:
+            await logger.error(
+                f"Failed to record job of scheduled notification {schedule_id}: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={"schedule_id": schedule_id, "job_id": job.id, "error_type": type(e).__name__}
+            )
+        await logger.info(
+            f"Released scheduled notification {schedule_id} as job {job.id}",
+            source=LogSource.SERVICE,
+            metadata={
+                "schedule_id": schedule_id,
+                "job_id": job.id,
+                "send_at": schedule.send_at,
+                "lag_seconds": round(time.time() - to_epoch(schedule.send_at), 3),
+                "device_count": len(schedule.device_ids)
+            }
+        )
+
+    async def _retry_later(self, schedule_id: str, error: Exception):
+        self.release_failures += 1
+        await logger.error(
+            f"Failed to release scheduled notification {schedule_id}, retrying in {RELEASE_RETRY_SECONDS}s: {str(error)}",
+            source=LogSource.SERVICE,
+            metadata={
+                "schedule_id": schedule_id,
+                "error_type": type(error).__name__,
+                "error_details": str(error)
+            }
+        )
+        self._push(time.time() + RELEASE_RETRY_SECONDS, schedule_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._heap),
+            "next_due_in_seconds": round(max(0.0, self._heap[0][0] - time.time()), 3) if self._heap else None,
+            "scheduled": self.scheduled,
+            "released": self.released,
+            "cancelled": self.cancelled,
+            "release_failures": self.release_failures,
+            "release_limiter": self.release_limiter.get_stats(),
+        }
+
+    async def close(self):
+        """Stop the timer task; pending schedules stay in the database for the next start"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# Global scheduler instance
+notification_scheduler = NotificationScheduler()
@@ -1,95 +1,191 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, AsyncIterable, AsyncIterator
+import asyncio
+from collections import Counter
 from pywebpush import WebPushException
 from app.models.notification_result import NotificationResult
 from app.services.subscription_service import SubscriptionLookupService
-from app.services.webpush_service import WebPushSender
+from app.services.webpush_service import get_web_push_sender, RetryScheduled
 from app.services.result_processor import NotificationResultProcessor
+from app.utils.payload import render_payload
+from app.services.notification_coalescer import notification_coalescer
+from app.services.subscription_pruner import SubscriptionPruner, GONE_STATUS_CODES, is_expired
+from app.config import BROADCAST_MAX_IN_FLIGHT, NOTIFY_STREAM_CHUNK_SIZE
 from app.utils.logger import logger
-from app.models.log import LogSource
+from app.utils.metrics import notify_batch_size
+from app.utils.timings import PhaseTimings, collect_timings, timed_phase
+from app.models.log import LogLevel, LogSource
 
 class NotificationService:
     """Main service that orchestrates notification sending"""
     
-    def __init__(self):
+    def __init__(self, keep_results: bool = True, failures_only: bool = False, collect_timings: bool = False):
         self.subscription_service = SubscriptionLookupService()
-        self.web_push_sender = WebPushSender()
-        self.result_processor = NotificationResultProcessor()
+        self.web_push_sender = get_web_push_sender()
+        self.result_processor = NotificationResultProcessor(keep_results=keep_results, failures_only=failures_only)
+        self.pruner = SubscriptionPruner()
+        # Failed sends by HTTP status or exception type, for the batch summary log
+        self.error_counts = Counter()
+        # Per-phase timings for the debug block of the response, when requested
+        self.timings = PhaseTimings() if collect_timings else None
     
-    async def send_to_device(self, device_id: str, payload: Dict[str, Any]) -> NotificationResult:
-        """Send notification to a single device"""
+    async def send_to_subscription(self, device_id: str, subscription: Dict[str, Any], data: bytes,
+                                   tag: Optional[str] = None) -> NotificationResult:
+        """Send notification to a single subscription endpoint of a device"""
+        if is_expired(subscription):
+            self.pruner.mark(subscription, "expired")
+            return NotificationResult(device_id, False, "Subscription expired")
+        
+        if tag is not None and notification_coalescer.enabled:
+            with timed_phase("coalesce_wait"):
+                if not await notification_coalescer.hold(subscription["endpoint"], tag):
+                    # A newer notification with the same tag replaces this one on the device
+                    return NotificationResult(device_id, True, superseded=True)
+        
         try:
-            # Find subscription
-            device_subscription = self.subscription_service.get_device_subscription(device_id)
-            
-            if not device_subscription:
-                await logger.warn(
-                    f"Subscription not found for device {device_id}",
-                    source=LogSource.SERVICE,
-                    metadata={"device_id": device_id}
-                )
-                return NotificationResult(device_id, False, "Subscription not found")
-            
             # Build subscription info for webpush
             subscription_info = {
-                "endpoint": device_subscription["endpoint"],
-                "keys": device_subscription["keys"]
+                "endpoint": subscription["endpoint"],
+                "keys": subscription["keys"]
             }
             
             # Send notification
-            self.web_push_sender.send_notification(subscription_info, payload)
+            await self.web_push_sender.send_notification(subscription_info, data, subscription)
             
             await logger.info(
                 f"Push notification sent successfully to device {device_id}",
                 source=LogSource.SERVICE,
                 metadata={
                     "device_id": device_id, 
-                    "endpoint": device_subscription["endpoint"]
-                }
+                    "endpoint": subscription["endpoint"]
+                },
+                sampled=True
             )
             
             return NotificationResult(device_id, True)
             
+        except RetryScheduled as retry:
+            # Accepted for delivery; the retry happens in the background and its outcome is logged
+            await logger.info(
+                f"Push notification to device {device_id} scheduled for retry in {retry.delay:.1f}s",
+                source=LogSource.SERVICE,
+                metadata={
+                    "device_id": device_id,
+                    "endpoint": subscription["endpoint"],
+                    "retry_in_seconds": round(retry.delay, 3)
+                },
+                sampled=True
+            )
+            return NotificationResult(device_id, True, retry_scheduled=True)
+            
         except WebPushException as ex:
+            status_code = ex.response.status_code if ex.response is not None else None
+            if status_code in GONE_STATUS_CODES:
+                self.pruner.mark(subscription, "gone")
+            self.error_counts[str(status_code or "WebPushException")] += 1
             await logger.error(
                 f"Web push failed for device {device_id}: {str(ex)}",
                 source=LogSource.SERVICE,
                 metadata={
                     "error_type": "WebPushException",
                     "device_id": device_id,
+                    "endpoint": subscription.get("endpoint"),
+                    "status_code": status_code,
                     "error_details": str(ex)
-                }
+                },
+                dedupe_key=f"webpush:{status_code}:{ex}"
             )
             return NotificationResult(device_id, False, f"Web push failed: {str(ex)}")
             
         except Exception as e:
+            self.error_counts[type(e).__name__] += 1
             await logger.error(
                 f"Notification failed for device {device_id}: {str(e)}",
                 source=LogSource.SERVICE,
                 metadata={
                     "error_type": type(e).__name__,
                     "device_id": device_id,
+                    "endpoint": subscription.get("endpoint"),
                     "error_details": str(e)
-                }
+                },
+                dedupe_key=f"send:{type(e).__name__}:{e}"
             )
             return NotificationResult(device_id, False, f"Notification failed: {str(e)}")
     
-    async def send_batch_notifications(self, device_ids: List[str], payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Send notifications to multiple devices and return response data"""
-        await logger.info(
-            f"Processing batch notification for {len(device_ids)} devices",
-            source=LogSource.SERVICE,
-            metadata={
-                "device_count": len(device_ids),
-                "payload_title": payload.get('title')
-            }
+    async def send_to_device(self, device_id: str, data: bytes, tag: Optional[str] = None) -> NotificationResult:
+        """Send notification to every subscription of a single device.
+        The device counts as successful if at least one endpoint accepted the notification."""
+        try:
+            # Find subscriptions
+            device_subscriptions = await self.subscription_service.get_device_subscriptions(device_id)
+        except Exception as e:
+            self.error_counts[type(e).__name__] += 1
+            await logger.error(
+                f"Subscription lookup failed for device {device_id}: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={
+                    "error_type": type(e).__name__,
+                    "device_id": device_id,
+                    "error_details": str(e)
+                },
+                dedupe_key=f"lookup:{type(e).__name__}:{e}"
+            )
+            return NotificationResult(device_id, False, f"Notification failed: {str(e)}")
+        
+        if not device_subscriptions:
+            await logger.warn(
+                f"Subscription not found for device {device_id}",
+                source=LogSource.SERVICE,
+                metadata={"device_id": device_id}
+            )
+            return NotificationResult(device_id, False, "Subscription not found")
+        
+        results = await asyncio.gather(
+            *(self.send_to_subscription(device_id, sub, data, tag) for sub in device_subscriptions)
         )
+        # Prefer an endpoint that was actually sent to over one whose notification was superseded or is awaiting a retry
+        return (next((r for r in results if r.success and not r.superseded and not r.retry_scheduled), None)
+                or next((r for r in results if r.success), results[0]))
+    
+    async def send_batch_notifications(self,
+                                       device_ids: List[str],
+                                       payload: Dict[str, Any],
+                                       on_result: Optional[Callable[[NotificationResult], None]] = None) -> Dict[str, Any]:
+        """Send notifications to multiple devices and return response data.
+        `on_result` is called as each device finishes, e.g. to report job progress."""
+        with collect_timings(self.timings):
+            # Render once for the whole batch; raises PayloadTooLargeError before anything is sent
+            data = render_payload(payload)
+            notify_batch_size.observe(len(device_ids), "notify")
         
-        # Send to each device
-        for device_id in device_ids:
-            result = await self.send_to_device(device_id, payload)
-            self.result_processor.add_result(result)
+            await logger.info(
+                f"Processing batch notification for {len(device_ids)} devices",
+                source=LogSource.SERVICE,
+                metadata={
+                    "device_count": len(device_ids),
+                    "payload_title": payload.get('title')
+                }
+            )
+        
+            # Fetch every subscription for the batch in one bulk query
+            with timed_phase("subscription_lookup"):
+                await self.subscription_service.load_device_subscriptions(device_ids)
+        
+            async def send(device_id: str) -> NotificationResult:
+                result = await self.send_to_device(device_id, data, payload.get("tag"))
+                if on_result:
+                    on_result(result)
+                return result
+        
+            # Send to all devices concurrently; WebPushSender enforces the concurrency limits
+            results = await asyncio.gather(*(send(device_id) for device_id in device_ids))
+            for result in results:
+                self.result_processor.add_result(result)
+            await self.pruner.flush()
+            await self._log_batch_completed()
         
-        # Log final results
+            return self.result_processor.get_response_data()
+    
+    async def _log_batch_completed(self):
         total, successful, failed = self.result_processor.get_summary()
         await logger.info(
             f"Batch notification completed: {successful} successful, {failed} failed",
@@ -97,8 +193,122 @@ class NotificationService:
             metadata={
                 "total_devices": total,
                 "successful_count": successful,
-                "failed_count": failed
+                "failed_count": failed,
+                "pruned_count": self.pruner.pruned,
+                "error_counts": dict(self.error_counts),
+                "success_log_sample_rate": logger.sampler.rate_for(LogLevel.INFO, LogSource.SERVICE)
             }
         )
+    
+    async def stream_batch_notifications(self,
+                                         device_ids: List[str],
+                                         payload: Dict[str, Any],
+                                         chunk_size: int = NOTIFY_STREAM_CHUNK_SIZE) -> AsyncIterator[List[NotificationResult]]:
+        """Send to a batch chunk by chunk, yielding results as devices finish.
+        Each yield holds the results that completed together. Only the current chunk's
+        subscriptions and sends (plus the next chunk's lookup) are in memory at a time,
+        and results are not kept. Closing the iterator cancels the remaining sends."""
+        with collect_timings(self.timings):
+            data = render_payload(payload)
+            notify_batch_size.observe(len(device_ids), "notify")
+        
+            await logger.info(
+                f"Processing streamed batch notification for {len(device_ids)} devices",
+                source=LogSource.SERVICE,
+                metadata={
+                    "device_count": len(device_ids),
+                    "chunk_size": chunk_size,
+                    "payload_title": payload.get('title')
+                }
+            )
+        
+            async def lookup(chunk: List[str]):
+                with timed_phase("subscription_lookup"):
+                    await self.subscription_service.load_device_subscriptions(chunk)
+        
+            chunks = [device_ids[start:start + chunk_size] for start in range(0, len(device_ids), chunk_size)]
+            pending = set()
+            next_lookup = asyncio.ensure_future(lookup(chunks[0])) if chunks else None
+            try:
+                for index, chunk in enumerate(chunks):
+                    await next_lookup
+                    # Look up the next chunk while this one is being sent
+                    next_lookup = asyncio.ensure_future(lookup(chunks[index + 1])) if index + 1 < len(chunks) else None
+                    pending = {asyncio.ensure_future(self.send_to_device(device_id, data, payload.get("tag"))) for device_id in chunk}
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        results = [task.result() for task in done]
+                        for result in results:
+                            self.result_processor.add_result(result)
+                        yield results
+                    self.subscription_service.release(chunk)
+                    if self.pruner.should_flush:
+                        await self.pruner.flush()
+            except BaseException:
+                for task in pending:
+                    task.cancel()
+                if next_lookup is not None:
+                    next_lookup.cancel()
+                raise
+            await self.pruner.flush()
+            await self._log_batch_completed()
+    
+    async def send_to_subscriptions(self,
+                                    subscriptions: AsyncIterable[Dict[str, Any]],
+                                    payload: Dict[str, Any],
+                                    on_result: Optional[Callable[[NotificationResult], None]] = None,
+                                    max_in_flight: int = BROADCAST_MAX_IN_FLIGHT) -> Dict[str, Any]:
+        """Send to a stream of subscriptions, e.g. a metadata-filtered broadcast.
+        At most `max_in_flight` sends are pending at once, so memory does not grow with the stream."""
+        with collect_timings(self.timings):
+            data = render_payload(payload)
+        
+            await logger.info(
+                "Processing broadcast notification",
+                source=LogSource.SERVICE,
+                metadata={"payload_title": payload.get('title')}
+            )
+        
+            in_flight = set()
+        
+            def collect(done):
+                for task in done:
+                    result = task.result()
+                    self.result_processor.add_result(result)
+                    if on_result:
+                        on_result(result)
+        
+            try:
+                async for subscription in subscriptions:
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                        collect(done)
+                    in_flight.add(asyncio.ensure_future(
+                        self.send_to_subscription(subscription.get("device_id"), subscription, data, payload.get("tag"))
+                    ))
+                    if self.pruner.should_flush:
+                        await self.pruner.flush()
+                if in_flight:
+                    done, in_flight = await asyncio.wait(in_flight)
+                    collect(done)
+            finally:
+                for task in in_flight:
+                    task.cancel()
+            await self.pruner.flush()
+        
+            total, successful, failed = self.result_processor.get_summary()
+            notify_batch_size.observe(total, "broadcast")
+            await logger.info(
+                f"Broadcast notification completed: {successful} successful, {failed} failed",
+                source=LogSource.SERVICE,
+                metadata={
+                    "total_subscriptions": total,
+                    "successful_count": successful,
+                    "failed_count": failed,
+                    "pruned_count": self.pruner.pruned,
+                    "error_counts": dict(self.error_counts),
+                    "success_log_sample_rate": logger.sampler.rate_for(LogLevel.INFO, LogSource.SERVICE)
+                }
+            )
         
-        return self.result_processor.get_response_data() 
\ No newline at end of file
+            return self.result_processor.get_response_data()
@@ -0,0 +1,87 @@
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+import httpx
+from app.config import (
+    PUSH_HTTP2,
+    PUSH_POOL_MAX_CONNECTIONS,
+    PUSH_POOL_KEEPALIVE_EXPIRY,
+    PUSH_REQUEST_TIMEOUT,
+)
+
+def get_origin(endpoint: str) -> str:
+    """Return the scheme://host[:port] origin of a push endpoint"""
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+class PushConnectionPool:
+    """Keeps one long-lived, keep-alive HTTP client per push service origin"""
+
+    def __init__(self,
+                 http2: bool = PUSH_HTTP2,
+                 max_connections: int = PUSH_POOL_MAX_CONNECTIONS,
+                 keepalive_expiry: float = PUSH_POOL_KEEPALIVE_EXPIRY,
+                 timeout: float = PUSH_REQUEST_TIMEOUT):
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, httpx.AsyncHTTPTransport] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _get_client(self, origin: str) -> httpx.AsyncClient:
+        client = self._clients.get(origin)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits)
+            client = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+            self._transports[origin] = transport
+            self._clients[origin] = client
+            self._stats[origin] = {"requests": 0, "connections_opened": 0}
+        return client
+
+    async def post(self, endpoint: str, content: bytes, headers: Dict[str, str]) -> httpx.Response:
+        """POST to a push endpoint over the pooled connection for its origin"""
+        origin = get_origin(endpoint)
+        client = self._get_client(origin)
+        stats = self._stats[origin]
+        stats["requests"] += 1
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                stats["connections_opened"] += 1
+
+        return await client.post(endpoint, content=content, headers=headers, extensions={"trace": trace})
+
+    def _open_connections(self, origin: str) -> Optional[int]:
+        pool = getattr(self._transports.get(origin), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        return len(connections) if connections is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-origin pool statistics: requests, new connections, reuse ratio and open connections"""
+        origins = {}
+        for origin, stats in self._stats.items():
+            requests = stats["requests"]
+            opened = stats["connections_opened"]
+            origins[origin] = {
+                "requests": requests,
+                "connections_opened": opened,
+                "reuse_ratio": round(1 - opened / requests, 4) if requests else None,
+                "open_connections": self._open_connections(origin),
+            }
+        return {
+            "http2": self.http2,
+            "max_connections_per_origin": self.limits.max_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "origins": origins,
+        }
+
+    async def close(self):
+        """Close every pooled client"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._transports.clear()
@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
+from app.models.log import LogSource
+from app.services.subscription_pruner import SubscriptionPruner, GONE_STATUS_CODES
+from app.utils.logger import logger
+
+# Sends the retry: (subscription_info, data, attempt, subscription row) -> True on success, raises otherwise
+RetrySend = Callable[[Dict[str, Any], bytes, int, Optional[Dict[str, Any]]], Awaitable[bool]]
+
+class PendingRetry:
+    __slots__ = ("subscription_info", "data", "attempt", "subscription")
+
+    def __init__(self, subscription_info: Dict[str, Any], data: bytes, attempt: int, subscription: Optional[Dict[str, Any]]):
+        self.subscription_info = subscription_info
+        self.data = data
+        self.attempt = attempt
+        # Stored subscription row, so a retry that finds the endpoint gone can prune it
+        self.subscription = subscription
+
+class PushRetryScheduler:
+    """Holds push sends waiting for a long backoff, so request coroutines don't sleep through it.
+
+    Pending retries sit in a heap of (due time, sequence, retry) served by a single timer task,
+    which starts each retry as a background send once it falls due. Outcomes are counted and
+    failures logged; subscriptions found gone on retry are pruned like in a regular batch."""
+
+    def __init__(self, send: RetrySend):
+        self.send = send
+        self._heap: List[Tuple[float, int, PendingRetry]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+        self.scheduled = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def schedule(self, delay: float, subscription_info: Dict[str, Any], data: bytes, attempt: int,
+                 subscription: Optional[Dict[str, Any]] = None):
+        """Send `data` again in `delay` seconds, as retry number `attempt`"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        retry = PendingRetry(subscription_info, data, attempt, subscription)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), retry))
+        self.scheduled += 1
+        if self._heap[0][2] is retry:
+            # New earliest entry: the timer has to wake up sooner than planned
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, retry = heapq.heappop(self._heap)
+            # Concurrency and rate limits are applied by the send itself
+            task = asyncio.create_task(self._retry(retry))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _retry(self, retry: PendingRetry):
+        try:
+            await self.send(retry.subscription_info, retry.data, retry.attempt, retry.subscription)
+            self.succeeded += 1
+            return
+        except Exception as e:
+            error = e
+        self.failed += 1
+        response = getattr(error, "response", None)
+        status_code = response.status_code if response is not None else None
+        if status_code in GONE_STATUS_CODES and retry.subscription is not None:
+            pruner = SubscriptionPruner()
+            pruner.mark(retry.subscription, "gone")
+            await pruner.flush()
+        await logger.error(
+            f"Deferred push retry failed: {str(error)}",
+            source=LogSource.SERVICE,
+            metadata={
+                "error_type": type(error).__name__,
+                "endpoint": retry.subscription_info.get("endpoint"),
+                "attempt": retry.attempt,
+                "status_code": status_code,
+            },
+            dedupe_key=f"push_retry:{status_code}:{type(error).__name__}"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._heap),
+            "in_flight": len(self._inflight),
+            "scheduled": self.scheduled,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+    async def close(self):
+        """Stop the timer and running retries; retries still pending are dropped and logged"""
+        tasks = list(self._inflight) + ([self._task] if self._task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        if self._heap:
+            await logger.warn(
+                f"Dropped {len(self._heap)} pending push retries on shutdown",
+                source=LogSource.SERVICE,
+                metadata={"dropped": len(self._heap)}
+            )
+            self._heap = []
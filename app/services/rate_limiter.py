@@ -0,0 +1,81 @@
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import asyncio
+import random
+import time
+
+class TokenBucket:
+    """Token bucket that hands out send slots at `rate` per second with bursts of up to `burst`.
+    Callers reserve a slot up front and sleep until it comes round, so waiters are served in order."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        # Point in time `tokens` is accounted at; moves into the future while the bucket is paused
+        self.updated = time.monotonic()
+        self.waits = 0
+        self.pauses = 0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            if self.rate > 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    async def acquire(self):
+        """Wait for the next send slot"""
+        now = time.monotonic()
+        self._refill(now)
+        delay = self.updated - now
+        if self.rate > 0:
+            self.tokens -= 1
+            if self.tokens < 0:
+                delay += -self.tokens / self.rate
+        if delay > 0:
+            self.waits += 1
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Hold every sender to this origin back for `seconds`, e.g. after a 429"""
+        now = time.monotonic()
+        self._refill(now)
+        until = now + seconds
+        if until > self.updated:
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = until
+            self.pauses += 1
+
+    def paused_for(self) -> float:
+        """Seconds until the bucket hands out slots again after a pause"""
+        return max(0.0, self.updated - time.monotonic())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "paused_for_seconds": round(self.paused_for(), 3),
+            "waits": self.waits,
+            "pauses": self.pauses,
+        }
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -1,22 +1,52 @@
-from typing import List, Dict, Any, Tuple
+import sys
+from typing import List, Dict, Any, Tuple, Optional, Set
 from app.models.notification_result import NotificationResult
 
 class NotificationResultProcessor:
     """Handles result counting and status code determination"""
     
-    def __init__(self):
-        self.results: List[NotificationResult] = []
+    def __init__(self, keep_results: bool = True, failures_only: bool = False):
+        # Broadcasts only keep counts so memory stays constant however many subscriptions match
+        self.keep_results = keep_results
+        # Keep (and answer with) only failed devices, plus the error histogram
+        self.failures_only = failures_only
+        self.total = 0
+        self.successful = 0
+        self.superseded = 0
+        self.retry_scheduled = 0
+        # Results are stored as parallel lists rather than one object per device; None marks a success
+        self._device_ids: List[str] = []
+        self._errors: List[Optional[str]] = []
+        # Positions in the lists above of superseded (coalesced) notifications
+        self._superseded: Set[int] = set()
+        # Positions of notifications accepted but waiting for a retry
+        self._retry_scheduled: Set[int] = set()
+        # error message -> number of failed devices
+        self.error_counts: Dict[str, int] = {}
     
     def add_result(self, result: NotificationResult):
         """Add a notification result"""
-        self.results.append(result)
+        self.total += 1
+        error = None
+        if result.success:
+            self.successful += 1
+            self.superseded += result.superseded
+            self.retry_scheduled += result.retry_scheduled
+        else:
+            # Interned so each distinct message is stored once however many devices hit it
+            error = sys.intern(result.error or "Unknown error")
+            self.error_counts[error] = self.error_counts.get(error, 0) + 1
+        if self.keep_results and (error is not None or not self.failures_only):
+            if result.superseded:
+                self._superseded.add(len(self._device_ids))
+            if result.retry_scheduled:
+                self._retry_scheduled.add(len(self._device_ids))
+            self._device_ids.append(result.device_id)
+            self._errors.append(error)
     
     def get_summary(self) -> Tuple[int, int, int]:
         """Returns (total, successful, failed) counts"""
-        total = len(self.results)
-        successful = sum(1 for r in self.results if r.success)
-        failed = total - successful
-        return total, successful, failed
+        return self.total, self.successful, self.total - self.successful
     
     def get_status_code_and_message(self) -> Tuple[int, str]:
         """Determine appropriate HTTP status code and message"""
@@ -29,22 +59,50 @@ class NotificationResultProcessor:
         else:
             return 207, f"{successful} notifications sent, {failed} failed"
     
+    @staticmethod
+    def format_result(result: NotificationResult) -> Dict[str, Any]:
+        """Per-device entry of the response"""
+        return {
+            "device_id": result.device_id,
+            "success": result.success,
+            **({"error": result.error} if result.error else {}),
+            **({"superseded": True} if result.superseded else {}),
+            **({"retry_scheduled": True} if result.retry_scheduled else {})
+        }
+    
+    def get_summary_data(self) -> Dict[str, int]:
+        total, successful, failed = self.get_summary()
+        return {
+            "total": total,
+            "successful": successful,
+            "failed": failed,
+            "superseded": self.superseded,
+            "retry_scheduled": self.retry_scheduled
+        }
+    
     def get_response_data(self) -> Dict[str, Any]:
         """Build the response data structure"""
-        total, successful, failed = self.get_summary()
+        summary = self.get_summary_data()
+        if not self.keep_results:
+            return {"summary": summary}
         
-        return {
-            "results": [
-                {
-                    "device_id": r.device_id,
-                    "success": r.success,
-                    **({"error": r.error} if r.error else {})
-                }
-                for r in self.results
-            ],
-            "summary": {
-                "total": total,
-                "successful": successful,
-                "failed": failed
+        results = [
+            {"device_id": device_id, "success": False, "error": error} if error is not None
+            else {"device_id": device_id, "success": True}
+            for device_id, error in zip(self._device_ids, self._errors)
+        ]
+        for index in self._superseded:
+            results[index]["superseded"] = True
+        for index in self._retry_scheduled:
+            results[index]["retry_scheduled"] = True
+        if self.failures_only:
+            return {
+                "failures": results,
+                "errors": self.error_counts,
+                "summary": summary
             }
-        } 
\ No newline at end of file
+        
+        return {
+            "results": results,
+            "summary": summary
+        }
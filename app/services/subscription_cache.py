@@ -0,0 +1,104 @@
+from typing import List, Dict, Any, Optional, Iterable
+from collections import OrderedDict
+import time
+from app.config import SUBSCRIPTION_CACHE_SIZE, SUBSCRIPTION_CACHE_TTL
+
+class SubscriptionCache:
+    """Process-wide LRU + TTL cache of subscriptions keyed by device ID"""
+
+    def __init__(self, max_size: int = SUBSCRIPTION_CACHE_SIZE, ttl: float = SUBSCRIPTION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # device_id -> (expires_at, subscriptions)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # endpoint -> device_id, so an endpoint moving between devices invalidates its old owner
+        self._endpoint_owners: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, device_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached subscriptions for a device, or None on a miss"""
+        entry = self._entries.get(device_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, subscriptions = entry
+        if expires_at <= time.monotonic():
+            self._remove(device_id)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(device_id)
+        self.hits += 1
+        return subscriptions
+
+    def set(self, device_id: str, subscriptions: List[Dict[str, Any]]):
+        """Cache the full subscription list of a device (an empty list caches 'not subscribed')"""
+        if self.max_size <= 0:
+            return
+        if device_id in self._entries:
+            self._remove(device_id)
+        self._entries[device_id] = (time.monotonic() + self.ttl, subscriptions)
+        for sub in subscriptions:
+            self._endpoint_owners[sub["endpoint"]] = device_id
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def upsert_subscription(self, subscription: Dict[str, Any]):
+        """Write-through update after a subscription row was upserted"""
+        endpoint = subscription["endpoint"]
+        device_id = subscription["device_id"]
+        previous_owner = self._endpoint_owners.get(endpoint)
+        if previous_owner is not None and previous_owner != device_id:
+            self.invalidate([previous_owner])
+
+        entry = self._entries.get(device_id)
+        if entry is None:
+            return
+        expires_at, subscriptions = entry
+        subscriptions = [sub for sub in subscriptions if sub["endpoint"] != endpoint] + [subscription]
+        self._entries[device_id] = (expires_at, subscriptions)
+        self._endpoint_owners[endpoint] = device_id
+
+    def upsert_subscriptions(self, subscriptions: Iterable[Dict[str, Any]]):
+        """Write-through update after a bulk upsert"""
+        for subscription in subscriptions:
+            self.upsert_subscription(subscription)
+
+    def invalidate(self, device_ids: Iterable[str]):
+        """Drop cached entries for the given devices"""
+        for device_id in device_ids:
+            self._remove(device_id)
+
+    def clear(self):
+        self._entries.clear()
+        self._endpoint_owners.clear()
+
+    def _remove(self, device_id: str):
+        entry = self._entries.pop(device_id, None)
+        if entry is None:
+            return
+        for sub in entry[1]:
+            if self._endpoint_owners.get(sub["endpoint"]) == device_id:
+                del self._endpoint_owners[sub["endpoint"]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+# Global cache instance shared by every request in the process
+subscription_cache = SubscriptionCache()
@@ -0,0 +1,107 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from app.config import SUBSCRIPTION_PRUNING, SUBSCRIPTION_PRUNE_BATCH_SIZE
+from app.db.methods import remove_subscriptions_by_ids
+from app.services.subscription_cache import subscription_cache
+from app.utils.logger import logger
+from app.models.log import LogSource
+
+# Push service responses meaning the subscription no longer exists
+GONE_STATUS_CODES = {404, 410}
+
+def parse_expiration_time(value: Any) -> Optional[datetime]:
+    """`expirationTime` from the browser is epoch milliseconds; ISO strings are accepted too"""
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.fromtimestamp(float(value) / 1000, tz=timezone.utc)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def is_expired(subscription: Dict[str, Any]) -> bool:
+    expires_at = parse_expiration_time(subscription.get("expiration_time"))
+    return expires_at is not None and expires_at <= datetime.now(timezone.utc)
+
+class PruneStats:
+    """Process-wide counters of pruned subscriptions"""
+
+    def __init__(self):
+        self.gone = 0
+        self.expired = 0
+        self.deleted = 0
+        self.delete_failures = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": SUBSCRIPTION_PRUNING,
+            "gone": self.gone,
+            "expired": self.expired,
+            "deleted": self.deleted,
+            "delete_failures": self.delete_failures,
+        }
+
+prune_stats = PruneStats()
+
+class SubscriptionPruner:
+    """Collects dead subscriptions during a batch and deletes them in bulk afterwards"""
+
+    def __init__(self, enabled: bool = SUBSCRIPTION_PRUNING, batch_size: int = SUBSCRIPTION_PRUNE_BATCH_SIZE):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        # subscription id -> device_id
+        self._pending: Dict[Any, str] = {}
+        self.pruned = 0
+
+    def mark(self, subscription: Dict[str, Any], reason: str):
+        """Queue a subscription for deletion; `reason` is 'gone' or 'expired'"""
+        subscription_id = subscription.get("id")
+        if not self.enabled or subscription_id is None or subscription_id in self._pending:
+            return
+        self._pending[subscription_id] = subscription.get("device_id")
+        if reason == "expired":
+            prune_stats.expired += 1
+        else:
+            prune_stats.gone += 1
+
+    @property
+    def should_flush(self) -> bool:
+        return len(self._pending) >= self.batch_size
+
+    async def flush(self):
+        """Delete the collected subscriptions and drop their devices from the cache"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        subscription_ids: List[Any] = list(pending)
+        # The cached device lists still hold the dead endpoints
+        subscription_cache.invalidate(set(pending.values()))
+        try:
+            await remove_subscriptions_by_ids(subscription_ids)
+        except Exception as e:
+            prune_stats.delete_failures += len(subscription_ids)
+            await logger.error(
+                f"Failed to prune {len(subscription_ids)} subscriptions: {str(e)}",
+                source=LogSource.SERVICE,
+                metadata={
+                    "error_type": type(e).__name__,
+                    "error_details": str(e),
+                    "subscription_count": len(subscription_ids)
+                }
+            )
+            return
+
+        self.pruned += len(subscription_ids)
+        prune_stats.deleted += len(subscription_ids)
+        await logger.info(
+            f"Pruned {len(subscription_ids)} dead subscriptions",
+            source=LogSource.SERVICE,
+            metadata={
+                "subscription_count": len(subscription_ids),
+                "device_ids": sorted(set(pending.values()), key=str)[:100]
+            }
+        )
@@ -1,18 +1,42 @@
-from typing import Optional, Dict, Any
-from app.db.methods import get_subscriptions
+from typing import List, Dict, Any, Iterable
+from app.db.methods import get_subscriptions_by_device_ids
+from app.services.subscription_cache import subscription_cache
 
 class SubscriptionLookupService:
     """Handles finding device subscriptions"""
     
     def __init__(self):
-        self.subscriptions_cache = None
+        self.subscriptions_index: Dict[str, List[Dict[str, Any]]] = {}
     
-    def get_device_subscription(self, device_id: str) -> Optional[Dict[str, Any]]:
-        """Get subscription data for a specific device"""
-        if self.subscriptions_cache is None:
-            self.subscriptions_cache = get_subscriptions()
+    async def load_device_subscriptions(self, device_ids: Iterable[str]):
+        """Index subscriptions for the given devices, serving hot devices from the shared
+        cache and fetching the rest in one bulk query"""
+        missing = []
+        for device_id in dict.fromkeys(device_ids):
+            if device_id in self.subscriptions_index:
+                continue
+            cached = subscription_cache.get(device_id)
+            if cached is not None:
+                self.subscriptions_index[device_id] = cached
+            else:
+                missing.append(device_id)
+        if not missing:
+            return
         
-        return next(
-            (sub for sub in self.subscriptions_cache if sub.get("device_id") == device_id), 
-            None
-        ) 
\ No newline at end of file
+        fetched: Dict[str, List[Dict[str, Any]]] = {device_id: [] for device_id in missing}
+        for sub in await get_subscriptions_by_device_ids(missing):
+            fetched.setdefault(sub.get("device_id"), []).append(sub)
+        for device_id, subscriptions in fetched.items():
+            subscription_cache.set(device_id, subscriptions)
+            self.subscriptions_index[device_id] = subscriptions
+    
+    def release(self, device_ids: Iterable[str]):
+        """Drop devices that have been sent to from the index; they stay in the shared cache"""
+        for device_id in device_ids:
+            self.subscriptions_index.pop(device_id, None)
+    
+    async def get_device_subscriptions(self, device_id: str) -> List[Dict[str, Any]]:
+        """Get every subscription (endpoint) registered for a specific device"""
+        if device_id not in self.subscriptions_index:
+            await self.load_device_subscriptions([device_id])
+        return self.subscriptions_index[device_id]
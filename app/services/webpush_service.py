@@ -1,20 +1,257 @@
-from typing import Dict, Any
-import json
-from pywebpush import webpush
-from app.utils.vapid import get_vapid_config
+from typing import Dict, Any, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import time
+import httpx
+from pywebpush import WebPusher, WebPushException
+from app.config import (
+    PUSH_MAX_CONCURRENCY,
+    PUSH_MAX_CONCURRENCY_PER_HOST,
+    PUSH_RATE_LIMIT_PER_HOST,
+    PUSH_RATE_LIMIT_BURST,
+    PUSH_MAX_RETRIES,
+    PUSH_RETRY_BASE_DELAY,
+    PUSH_RETRY_MAX_DELAY,
+    PUSH_RETRY_INLINE_MAX_DELAY,
+    PUSH_ENCRYPTION_EXECUTOR,
+    PUSH_ENCRYPTION_WORKERS,
+)
+from app.services.push_connection_pool import PushConnectionPool, get_origin
+from app.services.push_retry_scheduler import PushRetryScheduler
+from app.services.rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+from app.utils.vapid import get_vapid_config, VapidSigner
+from app.utils.metrics import push_send_duration, push_send_total
+from app.utils.timings import timed_phase, record_phase
+
+CONTENT_ENCODING = "aes128gcm"
+
+# Push service responses worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+ENCRYPTION_EXECUTORS = ("inline", "thread", "process")
+
+class RetryScheduled(Exception):
+    """The send is waiting for a retry in the sender's retry scheduler rather than in the caller"""
+
+    def __init__(self, delay: float):
+        super().__init__(f"Retry scheduled in {delay:.1f}s")
+        self.delay = delay
+
+def encrypt_payload(subscription_info: Dict[str, Any], data: bytes) -> bytes:
+    """ECDH key agreement + aes128gcm encryption for one recipient.
+    Module level so it can be pickled into a process pool."""
+    return WebPusher(subscription_info).encode(data, CONTENT_ENCODING)["body"]
+
+def create_encryption_executor(kind: str = PUSH_ENCRYPTION_EXECUTOR, workers: Optional[int] = PUSH_ENCRYPTION_WORKERS) -> Optional[Executor]:
+    """Pool that encryption is offloaded to, or None to encrypt on the event loop"""
+    if kind not in ENCRYPTION_EXECUTORS:
+        raise ValueError(f"Unknown PUSH_ENCRYPTION_EXECUTOR '{kind}', expected one of: {', '.join(ENCRYPTION_EXECUTORS)}")
+    if kind == "inline":
+        return None
+    if kind == "process":
+        # Spawned, not forked: a forked child would inherit the running event loop, open
+        # connections and locks held by other threads of the server process
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+_encryption_executor: Optional[Executor] = None
+_encryption_executor_created = False
+
+def get_encryption_executor() -> Optional[Executor]:
+    """Shared encryption pool; created on first use unless the lifespan already did"""
+    global _encryption_executor, _encryption_executor_created
+    if not _encryption_executor_created:
+        _encryption_executor = create_encryption_executor()
+        _encryption_executor_created = True
+    return _encryption_executor
+
+def start_encryption_executor():
+    """Create the encryption pool at application startup, outside of any request.
+    Independent of the sender, so the app still starts when VAPID is not configured."""
+    get_encryption_executor()
+
+def close_encryption_executor():
+    global _encryption_executor, _encryption_executor_created
+    if _encryption_executor is not None:
+        _encryption_executor.shutdown(wait=False)
+    _encryption_executor = None
+    _encryption_executor_created = False
 
 class WebPushSender:
     """Handles actual web push notification sending"""
-    
-    def __init__(self):
+
+    def __init__(self, max_concurrency: int = PUSH_MAX_CONCURRENCY, max_concurrency_per_host: int = PUSH_MAX_CONCURRENCY_PER_HOST):
         self.vapid_private_key, self.vapid_public_key, self.vapid_email = get_vapid_config()
-    
-    def send_notification(self, subscription_info: Dict[str, Any], payload: Dict[str, Any]) -> bool:
-        """Send notification to a single subscription. Returns True if successful."""
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload),
-            vapid_private_key=self.vapid_private_key,
-            vapid_claims={"sub": f"mailto:{self.vapid_email}"}
-        )
-        return True 
\ No newline at end of file
+        self.vapid_signer = VapidSigner(self.vapid_private_key, self.vapid_email)
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.connection_pool = PushConnectionPool()
+        self.encryption_executor = get_encryption_executor()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._rate_limiters: Dict[str, TokenBucket] = {}
+        self.max_retries = PUSH_MAX_RETRIES
+        self.retry_base_delay = PUSH_RETRY_BASE_DELAY
+        self.retry_max_delay = PUSH_RETRY_MAX_DELAY
+        self.retry_inline_max_delay = PUSH_RETRY_INLINE_MAX_DELAY
+        self.retry_scheduler = PushRetryScheduler(self._send_deferred)
+        self.retries = 0
+        self.retries_exhausted = 0
+
+    def _get_host_semaphore(self, origin: str) -> asyncio.Semaphore:
+        """Get (or create) the concurrency limiter for a push service origin"""
+        semaphore = self._host_semaphores.get(origin)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency_per_host)
+            self._host_semaphores[origin] = semaphore
+        return semaphore
+
+    def _get_rate_limiter(self, origin: str) -> TokenBucket:
+        """Get (or create) the token bucket for a push service origin"""
+        limiter = self._rate_limiters.get(origin)
+        if limiter is None:
+            limiter = TokenBucket(PUSH_RATE_LIMIT_PER_HOST, PUSH_RATE_LIMIT_BURST)
+            self._rate_limiters[origin] = limiter
+        return limiter
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the send should not be retried"""
+        if attempt >= self.max_retries:
+            return None
+        if response is not None:
+            if response.status_code not in RETRY_STATUS_CODES:
+                return None
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            if retry_after is not None:
+                # Waiting longer than we are willing to would only tie up the batch
+                return retry_after if retry_after <= self.retry_max_delay else None
+        return backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+
+    async def _encrypt(self, subscription_info: Dict[str, Any], data: bytes) -> bytes:
+        if self.encryption_executor is None:
+            return encrypt_payload(subscription_info, data)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.encryption_executor, encrypt_payload, subscription_info, data)
+
+    async def send_notification(self,
+                                subscription_info: Dict[str, Any],
+                                data: bytes,
+                                subscription: Optional[Dict[str, Any]] = None,
+                                attempt: int = 0,
+                                defer: bool = True) -> bool:
+        """Send already rendered payload bytes to a single subscription. Returns True if successful.
+        Throttled (429) and 5xx responses are retried with backoff, honouring Retry-After.
+
+        Waits of up to `retry_inline_max_delay` happen here. With `defer`, longer ones (a backoff,
+        or the origin paused after a 429) are handed to the retry scheduler and RetryScheduled is
+        raised, so the caller is not held for the wait. `subscription` is the stored row, used to
+        prune it if a deferred retry finds it gone."""
+        endpoint = subscription_info["endpoint"]
+        origin = get_origin(endpoint)
+        rate_limiter = self._get_rate_limiter(origin)
+        body = None
+        while True:
+            if defer:
+                paused = rate_limiter.paused_for()
+                if paused > self.retry_inline_max_delay:
+                    self.retry_scheduler.schedule(paused, subscription_info, data, attempt, subscription)
+                    raise RetryScheduled(paused)
+            with timed_phase("rate_limit_wait"):
+                await rate_limiter.acquire()
+            try:
+                wait_started = time.perf_counter()
+                # Per-host slot first: a saturated origin waits on its own limit without
+                # holding global slots that other origins could use
+                async with self._get_host_semaphore(origin), self._semaphore:
+                    record_phase("concurrency_wait", time.perf_counter() - wait_started)
+                    if body is None:
+                        # Encrypted once and reused by every attempt
+                        with timed_phase("encryption"):
+                            body = await self._encrypt(subscription_info, data)
+                    headers = {
+                        **self.vapid_signer.get_headers(origin),
+                        "content-encoding": CONTENT_ENCODING,
+                        "ttl": "0",
+                    }
+                    started = time.perf_counter()
+                    try:
+                        response = await self.connection_pool.post(endpoint, content=body, headers=headers)
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        push_send_duration.observe(elapsed, origin)
+                        record_phase("push_request", elapsed)
+                push_send_total.inc(origin, str(response.status_code))
+            except httpx.TransportError:
+                push_send_total.inc(origin, "error")
+                delay = self._retry_delay(attempt)
+                if delay is None:
+                    self.retries_exhausted += 1
+                    raise
+            else:
+                if response.status_code <= 202:
+                    return True
+                delay = self._retry_delay(attempt, response)
+                if response.status_code == 429:
+                    # Throttling applies to the whole origin, not just this subscription. The
+                    # advertised Retry-After is honoured even when this send is not retried.
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    pause = retry_after if retry_after is not None else delay
+                    if pause:
+                        rate_limiter.pause(pause)
+                    if delay is not None:
+                        delay = 0
+                if delay is None:
+                    if response.status_code in RETRY_STATUS_CODES:
+                        self.retries_exhausted += 1
+                    raise WebPushException(
+                        f"Push failed: {response.status_code} {response.reason_phrase}\nResponse body:{response.text}",
+                        response=response
+                    )
+
+            # Concurrency slots are released while waiting, so other sends keep flowing
+            attempt += 1
+            self.retries += 1
+            wait = delay if delay > 0 else rate_limiter.paused_for()
+            if defer and wait > self.retry_inline_max_delay:
+                self.retry_scheduler.schedule(wait, subscription_info, data, attempt, subscription)
+                raise RetryScheduled(wait)
+            if delay > 0:
+                with timed_phase("retry_backoff"):
+                    await asyncio.sleep(delay)
+
+    async def _send_deferred(self, subscription_info: Dict[str, Any], data: bytes, attempt: int,
+                             subscription: Optional[Dict[str, Any]] = None) -> bool:
+        """Retry started by the retry scheduler; runs in the background, so it waits inline"""
+        return await self.send_notification(subscription_info, data, subscription, attempt=attempt, defer=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retry counters and per-origin rate limiter state"""
+        return {
+            "encryption_executor": type(self.encryption_executor).__name__ if self.encryption_executor else "inline",
+            "max_retries": self.max_retries,
+            "retries": self.retries,
+            "retries_exhausted": self.retries_exhausted,
+            "retry_scheduler": self.retry_scheduler.get_stats(),
+            "rate_limits": {origin: limiter.get_stats() for origin, limiter in self._rate_limiters.items()},
+        }
+
+    async def close(self):
+        """Stop deferred retries and release pooled push service connections; the encryption pool is closed separately"""
+        await self.retry_scheduler.close()
+        await self.connection_pool.close()
+
+_web_push_sender: Optional[WebPushSender] = None
+
+def get_web_push_sender() -> WebPushSender:
+    """Shared sender so concurrency limits and connection pools span all requests in the process"""
+    global _web_push_sender
+    if _web_push_sender is None:
+        _web_push_sender = WebPushSender()
+    return _web_push_sender
+
+async def close_web_push_sender():
+    """Close the shared sender, if one was created"""
+    global _web_push_sender
+    if _web_push_sender is not None:
+        await _web_push_sender.close()
+        _web_push_sender = None
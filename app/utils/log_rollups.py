@@ -0,0 +1,65 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from app.config import LOG_STATS_RETENTION_HOURS
+from app.db.methods import add_log_rollups, get_log_rollup_totals
+from app.models.log import LogLevel, LogSource
+
+class LogRollups:
+    """Per-minute log counts by level and source, persisted in the log_rollups table.
+
+    Counts are accumulated in memory and added to the table whenever the log sink flushes,
+    so they survive restarts and cover every worker process. Statistics for any window inside
+    the retention period are answered from at most one row per minute, level and source,
+    independent of how many rows the logs table holds.
+    """
+
+    def __init__(self, retention_hours: int = LOG_STATS_RETENTION_HOURS):
+        self.retention_hours = retention_hours
+        # (minute start, level, source) -> count not yet added to the table
+        self._pending: Counter = Counter()
+
+    @staticmethod
+    def _minute(timestamp: datetime) -> str:
+        return timestamp.replace(second=0, microsecond=0).isoformat()
+
+    def record(self, level: LogLevel, source: LogSource, timestamp: Optional[datetime] = None):
+        """Count one log row in its minute bucket"""
+        self._pending[(self._minute(timestamp or datetime.utcnow()), level.value, source.value)] += 1
+
+    async def flush(self):
+        """Add the pending counts to the table; on failure they are kept for the next flush"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        rows = [
+            {"minute": minute, "level": level, "source": source, "count": count}
+            for (minute, level, source), count in pending.items()
+        ]
+        expire_before = self._minute(datetime.utcnow() - timedelta(hours=self.retention_hours))
+        try:
+            await add_log_rollups(rows, expire_before)
+        except Exception:
+            self._pending.update(pending)
+            raise
+
+    async def get_stats(self, window: timedelta, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Total and per level/source counts for the last `window`, including the current minute"""
+        # Counts of this process that are still in memory are included as well
+        await self.flush()
+        now = now or datetime.utcnow()
+        window = min(window, timedelta(hours=self.retention_hours))
+        since = self._minute(now - window)
+        totals: Dict[Tuple[str, str], int] = Counter()
+        for row in await get_log_rollup_totals(since):
+            totals[("level", row["level"])] += row["count"]
+            totals[("source", row["source"])] += row["count"]
+
+        return {
+            "total_logs": sum(totals[("level", level.value)] for level in LogLevel),
+            "by_level": {level.value: totals[("level", level.value)] for level in LogLevel},
+            "by_source": {source.value: totals[("source", source.value)] for source in LogSource},
+        }
+
+# Global rollups instance, fed by the logger
+log_rollups = LogRollups()
@@ -0,0 +1,124 @@
+import asyncio
+import random
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional
+from app.config import LOG_SAMPLE_RATES, LOG_ERROR_DEDUPE_WINDOW
+from app.models.log import LogLevel, LogSource
+
+# Levels that are always written, whatever the configured rates say
+UNSAMPLED_LEVELS = (LogLevel.ERROR, LogLevel.CRITICAL)
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "info=0.01,info:client=1" into {"info": 0.01, "info:client": 1.0}"""
+    rates = {}
+    for pair in spec.split(","):
+        if not pair.strip():
+            continue
+        key, _, rate = pair.partition("=")
+        try:
+            rates[key.strip().lower()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            raise ValueError(f"Invalid log sample rate: {pair.strip()}")
+    return rates
+
+class LogSampler:
+    """Decides which sampled rows are kept, by the rate configured for their level and source.
+    A "level:source" rate takes precedence over a plain "level" rate; unlisted levels are kept."""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        self.rates = parse_sample_rates(LOG_SAMPLE_RATES) if rates is None else rates
+        self.kept = 0
+        self.sampled_out = 0
+
+    def rate_for(self, level: LogLevel, source: LogSource) -> float:
+        if level in UNSAMPLED_LEVELS:
+            return 1.0
+        rate = self.rates.get(f"{level.value}:{source.value}")
+        if rate is None:
+            rate = self.rates.get(level.value, 1.0)
+        return rate
+
+    def keep(self, level: LogLevel, source: LogSource) -> bool:
+        rate = self.rate_for(level, source)
+        if rate >= 1.0 or random.random() < rate:
+            self.kept += 1
+            return True
+        self.sampled_out += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rates": self.rates,
+            "kept": self.kept,
+            "sampled_out": self.sampled_out,
+        }
+
+LogEmitter = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class ErrorDeduplicator:
+    """Collapses identical errors within a time window.
+
+    The first occurrence of a key is written as usual. Repeats within `window` seconds are
+    only counted, and when the window closes one summary row with the count is written."""
+
+    def __init__(self, emit: LogEmitter, window: float = LOG_ERROR_DEDUPE_WINDOW):
+        self.emit = emit
+        self.window = window
+        # key -> [first log row, repeat count, last seen, timer handle]
+        self._open: Dict[str, list] = {}
+        self._flushes = set()
+        self.deduplicated = 0
+
+    def is_repeat(self, key: str, log_entry: Dict[str, Any]) -> bool:
+        """Count `log_entry` against its key; True if it should not be written itself"""
+        if self.window <= 0:
+            return False
+        entry = self._open.get(key)
+        if entry is not None:
+            entry[1] += 1
+            entry[2] = log_entry["timestamp"]
+            self.deduplicated += 1
+            return True
+        handle = asyncio.get_running_loop().call_later(self.window, self._close_window, key)
+        self._open[key] = [log_entry, 0, log_entry["timestamp"], handle]
+        return False
+
+    def _close_window(self, key: str):
+        task = asyncio.ensure_future(self._flush(key))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, key: str):
+        entry = self._open.pop(key, None)
+        if entry is None:
+            # Already flushed, e.g. by close() before the window's timer fired
+            return
+        first, repeats, last_seen, handle = entry
+        handle.cancel()
+        if not repeats:
+            return
+        await self.emit({
+            **first,
+            "message": f"{first['message']} (repeated {repeats} more times)",
+            "metadata": {
+                **(first.get("metadata") or {}),
+                "repeat_count": repeats,
+                "first_seen": first["timestamp"],
+                "last_seen": last_seen,
+            },
+            "timestamp": datetime.utcnow().isoformat(),
+        })
+
+    async def close(self):
+        """Write the summary rows of every open window; called on shutdown"""
+        for key in list(self._open):
+            await self._flush(key)
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window,
+            "open_windows": len(self._open),
+            "deduplicated": self.deduplicated,
+        }
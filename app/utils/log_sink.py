@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+from app.config import (
+    LOG_SINK_QUEUE_SIZE,
+    LOG_SINK_BATCH_SIZE,
+    LOG_SINK_FLUSH_INTERVAL,
+    LOG_SINK_OVERFLOW_POLICY,
+    LOG_SINK_SAMPLE_RATE,
+)
+
+OVERFLOW_POLICIES = ("drop", "sample", "block")
+# Levels that are never sampled away while the queue is under pressure
+UNSAMPLED_LEVELS = ("error", "critical")
+
+LogWriter = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+class LogSink:
+    """Buffers log rows in a bounded queue and writes them in bulk from a background task.
+
+    Rows are flushed once `batch_size` rows are waiting or `flush_interval` seconds after
+    the first row of a batch arrived, whichever comes first. When the queue is full the
+    overflow policy decides what happens to new rows:
+
+    - drop: discard the new row
+    - sample: once the queue is half full keep only `sample_rate` of non-error rows,
+      and discard rows when it is full
+    - block: make the caller wait for space
+    """
+
+    def __init__(self,
+                 writer: LogWriter,
+                 max_queue_size: int = LOG_SINK_QUEUE_SIZE,
+                 batch_size: int = LOG_SINK_BATCH_SIZE,
+                 flush_interval: float = LOG_SINK_FLUSH_INTERVAL,
+                 overflow_policy: str = LOG_SINK_OVERFLOW_POLICY,
+                 sample_rate: float = LOG_SINK_SAMPLE_RATE):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log sink overflow policy: {overflow_policy}")
+        self.writer = writer
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+        self.console_logger = logging.getLogger("push_service")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+        # Rows taken off the queue but not yet handed to the writer
+        self._pending: List[Dict[str, Any]] = []
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        self._discard_stale_loop()
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+                self._batch_ready = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    def _discard_stale_loop(self):
+        if self._worker is not None and self._worker.get_loop() is not asyncio.get_running_loop():
+            # Left behind by an event loop that was never closed down; none of its state can be reused
+            self._worker = self._inflight = self._queue = self._batch_ready = None
+            self._pending = []
+
+    async def put(self, entry: Dict[str, Any]):
+        """Queue a log row; returns immediately unless the policy is 'block' and the queue is full"""
+        self.start()
+        queue = self._queue
+
+        if queue.full():
+            if self.overflow_policy != "block":
+                self.dropped += 1
+                return
+            await queue.put(entry)
+        else:
+            if (self.overflow_policy == "sample"
+                    and queue.qsize() >= self.max_queue_size // 2
+                    and entry.get("level") not in UNSAMPLED_LEVELS
+                    and random.random() >= self.sample_rate):
+                self.sampled_out += 1
+                return
+            queue.put_nowait(entry)
+
+        self.enqueued += 1
+        if queue.qsize() >= self.batch_size - 1:
+            self._batch_ready.set()
+
+    async def _run(self):
+        while True:
+            self._pending = [await self._queue.get()]
+            if self._queue.qsize() + 1 < self.batch_size:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending = self._pending, []
+            self._drain_into(batch)
+            # Shield the write so shutdown can wait for it instead of losing the batch
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._inflight)
+
+    def _drain_into(self, batch: List[Dict[str, Any]]):
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            await self.writer(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            self.console_logger.error(f"Failed to write {len(batch)} logs to database: {e}")
+
+    async def close(self):
+        """Stop the background task and flush everything still queued"""
+        self._discard_stale_loop()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        batch, self._pending = self._pending, []
+        if self._queue is not None:
+            self._drain_into(batch)
+        while batch:
+            await self._write(batch)
+            batch = []
+            if self._queue is not None:
+                self._drain_into(batch)
+        # The queue is bound to this event loop; a restarted sink creates a new one
+        self._queue = None
+        self._batch_ready = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "written": self.written,
+            "failed": self.failed,
+        }
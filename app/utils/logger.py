@@ -2,9 +2,13 @@ import logging
 import json
 import sys
 from datetime import datetime
-from typing import Dict, Any, Optional
-from app.dependencies import get_supabase_client
+from typing import List, Dict, Any, Optional
+from app.db.methods import insert_logs
 from app.models.log import LogLevel, LogSource, LogEntry
+from app.utils.log_sink import LogSink
+from app.utils.log_rollups import log_rollups
+from app.utils.log_sampling import LogSampler, ErrorDeduplicator
+from app.utils.timings import timed_phase
 
 class StructuredLogger:
     def __init__(self):
@@ -41,6 +45,34 @@ class StructuredLogger:
         
         console_handler.setFormatter(JSONFormatter())
         self.console_logger.addHandler(console_handler)
+        
+        # Database rows are written in bulk by a background sink
+        self.sink = LogSink(self._write_batch)
+        # High-volume rows are sampled, repeated errors collapsed, before they reach the sink
+        self.sampler = LogSampler()
+        self.deduplicator = ErrorDeduplicator(self._write_repeated)
+    
+    async def _insert_logs(self, log_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk insert log rows through the database backend"""
+        return await insert_logs(log_entries)
+    
+    async def _write_batch(self, log_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sink writer: insert a batch of log rows, then persist the rollup counts alongside"""
+        rows = await self._insert_logs(log_entries)
+        try:
+            await log_rollups.flush()
+        except Exception as e:
+            # The rows are written; the counts stay pending and go out with the next batch
+            self.console_logger.error(f"Failed to persist log rollups: {str(e)}")
+        return rows
+    
+    async def _write_repeated(self, log_entry: Dict[str, Any]):
+        """Write the repeat-count row of a deduplicated error to console and database"""
+        self.console_logger.log(
+            logging.getLevelName(log_entry["level"].upper()), log_entry["message"],
+            extra={"metadata": log_entry["metadata"]}
+        )
+        await self.sink.put(log_entry)
     
     async def log(self, 
                   level: LogLevel, 
@@ -49,34 +81,31 @@ class StructuredLogger:
                   client_id: Optional[str] = None,
                   user_agent: Optional[str] = None,
                   ip_address: Optional[str] = None,
-                  metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
-        """
-        Log a message to both console and database
-        Returns the log ID if database logging succeeds
+                  metadata: Optional[Dict[str, Any]] = None,
+                  wait: bool = False,
+                  sampled: bool = False,
+                  dedupe_key: Optional[str] = None) -> Optional[str]:
         """
+        Log a message to both console and database.
+        Database rows are queued and written in bulk in the background, so this returns
+        immediately. Pass wait=True to write the row right away and get its log ID back.
         
-        # Always log to console
-        log_data = {
-            "client_id": client_id,
-            "metadata": metadata,
-            "ip_address": ip_address,
-            "user_agent": user_agent
-        }
-        
-        # Map LogLevel to logging levels
-        level_map = {
-            LogLevel.DEBUG: logging.DEBUG,
-            LogLevel.INFO: logging.INFO,
-            LogLevel.WARN: logging.WARNING,
-            LogLevel.ERROR: logging.ERROR,
-            LogLevel.CRITICAL: logging.CRITICAL
-        }
+        sampled=True marks a high-volume row (one per device) that is only kept at the rate
+        configured for its level and source. Rows with the same dedupe_key within the dedupe
+        window are written once, followed by a single row with the repeat count.
+        """
+        with timed_phase("logging"):
+            now = datetime.utcnow()
+            # Rollups count every event, including the ones not written below
+            log_rollups.record(level, source, now)
         
-        self.console_logger.log(level_map[level], message, extra=log_data)
+            if sampled and not self.sampler.keep(level, source):
+                return None
+            if sampled:
+                sample_rate = self.sampler.rate_for(level, source)
+                if sample_rate < 1.0:
+                    metadata = {**(metadata or {}), "sample_rate": sample_rate}
         
-        # Try to log to database using centralized client
-        try:
-            supabase = get_supabase_client()
             log_entry = {
                 "level": level.value,
                 "message": message,
@@ -85,19 +114,52 @@ class StructuredLogger:
                 "user_agent": user_agent,
                 "ip_address": ip_address,
                 "metadata": metadata,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now.isoformat()
             }
-            
-            result = supabase.table("logs").insert(log_entry).execute()
-            if result.data:
-                log_id = result.data[0].get("id")
-                if log_id:
-                    print(f"New {level.value} logged with id: {log_id}")
-                return log_id
-        except Exception as e:
-            self.console_logger.error(f"Failed to log to database: {e}")
         
-        return None
+            if dedupe_key is not None and self.deduplicator.is_repeat(dedupe_key, log_entry):
+                return None
+        
+            # Always log to console
+            log_data = {
+                "client_id": client_id,
+                "metadata": metadata,
+                "ip_address": ip_address,
+                "user_agent": user_agent
+            }
+        
+            # Map LogLevel to logging levels
+            level_map = {
+                LogLevel.DEBUG: logging.DEBUG,
+                LogLevel.INFO: logging.INFO,
+                LogLevel.WARN: logging.WARNING,
+                LogLevel.ERROR: logging.ERROR,
+                LogLevel.CRITICAL: logging.CRITICAL
+            }
+        
+            self.console_logger.log(level_map[level], message, extra=log_data)
+        
+            if not wait:
+                await self.sink.put(log_entry)
+                return None
+        
+            try:
+                rows = await self._insert_logs([log_entry])
+                if rows:
+                    return rows[0].get("id")
+            except Exception as e:
+                self.console_logger.error(f"Failed to log to database: {e}")
+        
+            return None
+    
+    async def close(self):
+        """Flush queued log rows; called on application shutdown"""
+        await self.deduplicator.close()
+        await self.sink.close()
+        try:
+            await log_rollups.flush()
+        except Exception as e:
+            self.console_logger.error(f"Failed to persist log rollups: {str(e)}")
     
     # Convenience methods
     async def debug(self, message: str, **kwargs):
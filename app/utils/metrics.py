@@ -0,0 +1,148 @@
+from typing import List, Dict, Any, Callable, Sequence, Tuple, Union
+from bisect import bisect_left
+import math
+
+# Everything runs on the event loop thread, so updates are plain arithmetic with no locks
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+LabelValues = Tuple[str, ...]
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in self._values.items()]
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        entry = self._values.get(labelvalues)
+        if entry is None:
+            entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self._values[labelvalues] = entry
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        bucket_labelnames = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", _format_labels(bucket_labelnames, labels + (_format_value(bound),)), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), count))
+        return samples
+
+class GaugeFunction:
+    """Gauge (or counter) read from a callback at scrape time.
+    The callback returns a number, or a dict of label value(s) -> number."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Union[float, Dict[Any, float], None]],
+                 labelnames: Sequence[str] = (), type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        value = self.fn()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            return [(self.name, "", value)]
+        return [
+            (self.name, _format_labels(self.labelnames, labels if isinstance(labels, tuple) else (labels,)), sample)
+            for labels, sample in value.items()
+            if sample is not None
+        ]
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge_function(self, name: str, help: str, fn: Callable, labelnames: Sequence[str] = (), type: str = "gauge") -> GaugeFunction:
+        return self._register(GaugeFunction(name, help, fn, labelnames, type))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# Global registry shared by the whole process
+metrics = MetricsRegistry()
+
+push_send_duration = metrics.histogram(
+    "push_send_duration_seconds", "Push service request latency per attempt", ["origin"]
+)
+push_send_total = metrics.counter(
+    "push_send_total", "Push service responses by status code ('error' for transport failures)", ["origin", "status"]
+)
+notify_batch_size = metrics.histogram(
+    "notify_batch_size", "Devices per /notify batch and subscriptions per broadcast", ["kind"], BATCH_SIZE_BUCKETS
+)
+db_query_duration = metrics.histogram(
+    "db_query_duration_seconds", "DatabaseBackend call latency", ["method"]
+)
+db_query_errors = metrics.counter(
+    "db_query_errors_total", "DatabaseBackend calls that raised", ["method"]
+)
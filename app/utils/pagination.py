@@ -0,0 +1,18 @@
+import base64
+import json
+from typing import Any, Tuple
+from fastapi import HTTPException
+
+def encode_cursor(timestamp: str, row_id: Any) -> str:
+    """Opaque keyset cursor pointing just past the row with this (timestamp, id)"""
+    raw = json.dumps([timestamp, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, Any]:
+    """Inverse of encode_cursor; rejects malformed cursors with a 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return str(timestamp), row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,20 @@
+from typing import Dict, Any
+import orjson
+
+# Push services reject bodies over 4096 bytes; aes128gcm adds an 86 byte header,
+# a 1 byte padding delimiter and a 16 byte auth tag to the plaintext
+WEB_PUSH_MAX_BODY_BYTES = 4096
+AES128GCM_OVERHEAD_BYTES = 86 + 1 + 16
+MAX_PAYLOAD_BYTES = WEB_PUSH_MAX_BODY_BYTES - AES128GCM_OVERHEAD_BYTES
+
+class PayloadTooLargeError(ValueError):
+    pass
+
+def render_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a notification payload to the compact JSON bytes that get encrypted for every send"""
+    data = orjson.dumps(payload)
+    if len(data) > MAX_PAYLOAD_BYTES:
+        raise PayloadTooLargeError(
+            f"Notification payload is {len(data)} bytes; Web Push allows at most {MAX_PAYLOAD_BYTES}"
+        )
+    return data
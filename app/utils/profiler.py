@@ -0,0 +1,69 @@
+from typing import Dict, Any, List, Optional
+from collections import Counter
+import sys
+import threading
+import time
+from app.config import PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_STACKS
+
+class SamplingProfiler:
+    """Samples the call stack of one thread (the event loop) from a background thread.
+
+    Stacks are aggregated in collapsed form ("outer;inner;leaf" -> samples), ready for
+    flamegraph tools. The event loop is shared, so samples include other requests being
+    served at the same time."""
+
+    # One profile at a time keeps the overhead bounded
+    _active = threading.Lock()
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL, max_stacks: int = PROFILE_MAX_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._duration = 0.0
+
+    def start(self) -> bool:
+        """Start sampling the calling thread; False if another profile is already running"""
+        if not SamplingProfiler._active.acquire(blocking=False):
+            return False
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._duration = time.perf_counter() - self._started
+        SamplingProfiler._active.release()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def get_profile(self) -> Dict[str, Any]:
+        return {
+            "duration_ms": round(self._duration * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": [
+                {"stack": stack, "samples": count}
+                for stack, count in self._stacks.most_common(self.max_stacks)
+            ],
+        }
@@ -0,0 +1,66 @@
+from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+class PhaseTimings:
+    """Accumulates time spent per phase of a request.
+    Phases of concurrent sends overlap, so phase totals can add up to more than the wall time."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._phases: Dict[str, list] = {}
+
+    def add(self, phase: str, seconds: float):
+        entry = self._phases.get(phase)
+        if entry is None:
+            self._phases[phase] = [seconds, 1, seconds]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "phases": {
+                phase: {
+                    "total_ms": round(total * 1000, 3),
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 3),
+                    "max_ms": round(longest * 1000, 3),
+                }
+                for phase, (total, count, longest) in self._phases.items()
+            },
+        }
+
+# Timings of the request being handled; copied into every task it spawns
+current_timings: ContextVar[Optional[PhaseTimings]] = ContextVar("current_timings", default=None)
+
+def record_phase(phase: str, seconds: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+@contextmanager
+def timed_phase(phase: str):
+    """Time the block into the current request's timings; a no-op when none are being collected"""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+@contextmanager
+def collect_timings(timings: Optional[PhaseTimings]):
+    """Make `timings` the current request's timings for the duration of the block"""
+    token = current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        current_timings.reset(token)
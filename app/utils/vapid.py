@@ -1,7 +1,44 @@
+import os
+import time
+from typing import Dict, Tuple
 from fastapi import HTTPException
+from py_vapid import Vapid
 from app.config import VAPID_PRIVATE_KEY, VAPID_PUBLIC_KEY, VAPID_EMAIL
 
+# Push services reject tokens valid for more than 24h; 12h matches pywebpush's default
+VAPID_EXPIRY_SECONDS = 12 * 60 * 60
+# Re-sign this long before a cached token expires so in-flight sends never carry a stale one
+VAPID_REFRESH_MARGIN_SECONDS = 10 * 60
+
 def get_vapid_config():
     if not (VAPID_PRIVATE_KEY and VAPID_PUBLIC_KEY and VAPID_EMAIL):
         raise HTTPException(status_code=500, detail="VAPID keys or email not configured.")
-    return VAPID_PRIVATE_KEY, VAPID_PUBLIC_KEY, VAPID_EMAIL 
\ No newline at end of file
+    return VAPID_PRIVATE_KEY, VAPID_PUBLIC_KEY, VAPID_EMAIL
+
+class VapidSigner:
+    """Loads the VAPID key once and caches signed headers per push service audience"""
+
+    def __init__(self, private_key: str, email: str):
+        if os.path.isfile(private_key):
+            self.vapid = Vapid.from_file(private_key_file=private_key)
+        else:
+            self.vapid = Vapid.from_string(private_key=private_key)
+        self.subject = f"mailto:{email}"
+        # audience -> (refresh_at, headers)
+        self._headers_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+
+    def get_headers(self, audience: str) -> Dict[str, str]:
+        """Return VAPID Authorization headers for an audience, signing only when the cached token is near expiry"""
+        now = time.time()
+        cached = self._headers_cache.get(audience)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        expires_at = int(now) + VAPID_EXPIRY_SECONDS
+        headers = self.vapid.sign({
+            "sub": self.subject,
+            "aud": audience,
+            "exp": expires_at,
+        })
+        self._headers_cache[audience] = (expires_at - VAPID_REFRESH_MARGIN_SECONDS, headers)
+        return headers
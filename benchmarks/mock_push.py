@@ -0,0 +1,85 @@
+"""Stand-in push service for benchmarks.
+
+Accepts any POST and answers 201 after a fixed latency, or an error / 410 Gone
+at the configured rates:
+
+    python -m benchmarks.mock_push --port 8765 --latency-ms 20 --error-rate 0.01 --gone-rate 0.2
+
+A single process tops out around 190 responses/s; pass --workers to run several.
+"""
+import argparse
+import asyncio
+import os
+import random
+import uvicorn
+
+def create_app(latency_ms: float, error_rate: float, gone_rate: float, seed: int):
+    rng = random.Random(seed)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        roll = rng.random()
+        if roll < gone_rate:
+            status = 410
+        elif roll < gone_rate + error_rate:
+            status = 500
+        else:
+            status = 201
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-length", b"0")]})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+def create_app_from_env():
+    """App factory for worker processes, which get their settings through the environment"""
+    return create_app(
+        float(os.environ["MOCK_PUSH_LATENCY_MS"]),
+        float(os.environ["MOCK_PUSH_ERROR_RATE"]),
+        float(os.environ["MOCK_PUSH_GONE_RATE"]),
+        int(os.environ["MOCK_PUSH_SEED"]) + os.getpid()
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--gone-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        app = create_app(args.latency_ms, args.error_rate, args.gone_rate, args.seed)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+        return
+
+    os.environ.update({
+        "MOCK_PUSH_LATENCY_MS": str(args.latency_ms),
+        "MOCK_PUSH_ERROR_RATE": str(args.error_rate),
+        "MOCK_PUSH_GONE_RATE": str(args.gone_rate),
+        "MOCK_PUSH_SEED": str(args.seed),
+    })
+    uvicorn.run("benchmarks.mock_push:create_app_from_env", factory=True, workers=args.workers,
+                host=args.host, port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
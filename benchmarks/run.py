@@ -0,0 +1,270 @@
+"""End-to-end throughput benchmark for /api/notify and /logs/.
+
+Runs the FastAPI app in process against a local mock push service (see
+benchmarks/mock_push.py) and a throwaway SQLite database, and writes the
+results as JSON:
+
+    python -m benchmarks.run --sizes 100,1000,10000,100000 --output results.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+API_KEY = "benchmark"
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def latency_summary(latencies: List[float]) -> Dict[str, Any]:
+    """p50/p99/max of latencies given in seconds, reported in milliseconds"""
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else None,
+    }
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def configure_environment(args, workdir: str):
+    """Point the app at the stand-ins. Must run before anything under `app` is imported."""
+    from py_vapid import Vapid01, b64urlencode
+
+    vapid = Vapid01()
+    vapid.generate_keys()
+    private_value = vapid.private_key.private_numbers().private_value.to_bytes(32, "big")
+
+    os.environ.update({
+        "DATABASE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "benchmark.db"),
+        "API_KEY": API_KEY,
+        "VAPID_PRIVATE_KEY": b64urlencode(private_value),
+        "VAPID_PUBLIC_KEY": "benchmark",
+        "VAPID_EMAIL": "benchmark@example.com",
+    })
+    # Measure the pipeline rather than the default per-origin rate limit; still overridable from the shell
+    os.environ.setdefault("PUSH_RATE_LIMIT_PER_HOST", "0")
+
+def seed_subscriptions(device_count: int, endpoint_base: str):
+    """Insert one subscription per device straight into SQLite"""
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives import serialization
+    from app.db.sqlite import SqliteDatabase
+
+    # Every send still does its own ECDH with a fresh ephemeral key, so one receiver key is enough
+    receiver = ec.generate_private_key(ec.SECP256R1())
+    p256dh = receiver.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+    keys = json.dumps({
+        "p256dh": base64.urlsafe_b64encode(p256dh).decode().rstrip("="),
+        "auth": base64.urlsafe_b64encode(os.urandom(16)).decode().rstrip("="),
+    })
+
+    connection = SqliteDatabase()._open()
+    with connection:
+        connection.executemany(
+            "INSERT INTO subscriptions (endpoint, keys, metadata, device_id) VALUES (?, ?, ?, ?)",
+            (
+                (f"{endpoint_base}/{i}", keys, json.dumps({"benchmark": True}), f"bench-{i}")
+                for i in range(device_count)
+            )
+        )
+    connection.close()
+
+def start_mock_push(args) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.mock_push",
+        "--port", str(args.push_port),
+        "--latency-ms", str(args.latency_ms),
+        "--error-rate", str(args.error_rate),
+        "--gone-rate", str(args.gone_rate),
+        "--workers", str(args.push_workers),
+    ])
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", args.push_port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Mock push service did not start on port {args.push_port}")
+
+async def ingest_logs(client, stop: asyncio.Event, latencies: List[float], errors: Counter):
+    """One log client posting entries back to back until `stop` is set.
+    Only successful posts count towards the latencies; failures are counted by status code."""
+    body = {"level": "info", "message": "benchmark log entry", "source": "client", "metadata": {"benchmark": True}}
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.post("/logs/", json=body)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+            continue
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors[str(response.status_code)] += 1
+
+async def run_size(client, size: int, offset: int, args) -> Dict[str, Any]:
+    """Send `args.repeat` batches of `size` devices while the log clients run"""
+    device_ids = [f"bench-{i}" for i in range(offset, offset + size)]
+    stop = asyncio.Event()
+    log_latencies: List[float] = []
+    log_errors: Counter = Counter()
+    log_clients = [
+        asyncio.create_task(ingest_logs(client, stop, log_latencies, log_errors))
+        for _ in range(args.log_clients)
+    ]
+
+    runs = []
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        request_started = time.perf_counter()
+        response = await client.post(
+            "/api/notify",
+            json={"payload": {"title": "Benchmark", "body": "Benchmark notification"}, "device_ids": device_ids},
+            timeout=None
+        )
+        elapsed = time.perf_counter() - request_started
+        summary = response.json().get("data", {}).get("summary", {})
+        runs.append({
+            "status_code": response.status_code,
+            "seconds": round(elapsed, 3),
+            "sends_per_second": round(size / elapsed, 1),
+            "summary": summary,
+        })
+    duration = time.perf_counter() - started
+
+    stop.set()
+    await asyncio.gather(*log_clients)
+
+    latencies = [run["seconds"] for run in runs]
+    return {
+        "devices": size,
+        "repeat": args.repeat,
+        "sends_per_second": round(size * args.repeat / duration, 1),
+        "latency": latency_summary(latencies),
+        "runs": runs,
+        "log_ingestion": {
+            "clients": args.log_clients,
+            "logs_per_second": round(len(log_latencies) / duration, 1),
+            "errors": sum(log_errors.values()),
+            "errors_by_status": dict(log_errors),
+            "latency": latency_summary(log_latencies),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.utils.logger import logger
+
+    if not args.console_log:
+        # Keep the JSON formatting cost but not the terminal's
+        for handler in logger.console_logger.handlers:
+            handler.setStream(open(os.devnull, "w"))
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", headers={"x-api-key": API_KEY}) as client:
+            offset = 0
+            for size in args.sizes:
+                result = await run_size(client, size, offset, args)
+                offset += size
+                results.append(result)
+                print(
+                    f"{size:>7} devices: {result['sends_per_second']:>9} sends/s, "
+                    f"p50 {result['latency']['p50_ms']} ms, p99 {result['latency']['p99_ms']} ms, "
+                    f"{result['log_ingestion']['logs_per_second']} logs/s, peak RSS {result['peak_rss_mb']} MB",
+                    file=sys.stderr
+                )
+                log_errors = result["log_ingestion"]["errors_by_status"]
+                if log_errors:
+                    print(f"{size:>7} devices: /logs/ errors by status: {log_errors}", file=sys.stderr)
+            stats = (await client.get("/api/stats")).json()["data"]
+
+    return {
+        "benchmark": "notify_throughput",
+        "started_at": args.started_at,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "log_clients": args.log_clients,
+            "push_latency_ms": args.latency_ms,
+            "push_error_rate": args.error_rate,
+            "push_gone_rate": args.gone_rate,
+            "overrides": {key: value for key, value in os.environ.items() if key.startswith(("PUSH_", "LOG_SINK_", "SUBSCRIPTION_"))},
+        },
+        "results": results,
+        "stats": stats,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000",
+                        type=lambda value: [int(size) for size in value.split(",")],
+                        help="Comma separated batch sizes (devices per /api/notify request)")
+    parser.add_argument("--repeat", type=int, default=3, help="Requests per batch size")
+    parser.add_argument("--log-clients", type=int, default=4, help="Concurrent /logs/ clients running alongside")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Mock push service response latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of sends answered with 500")
+    parser.add_argument("--gone-rate", type=float, default=0.0, help="Share of sends answered with 410 Gone")
+    parser.add_argument("--push-port", type=int, default=8765)
+    parser.add_argument("--push-workers", type=int, default=4,
+                        help="Mock push service processes; one process tops out around 190 responses/s")
+    parser.add_argument("--console-log", action="store_true", help="Keep the app's console log output")
+    parser.add_argument("--output", default="-", help="File for the JSON results ('-' for stdout)")
+    args = parser.parse_args()
+    args.started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(args, workdir)
+        seed_subscriptions(sum(args.sizes), f"http://127.0.0.1:{args.push_port}/push")
+        mock_push = start_mock_push(args)
+        try:
+            report = asyncio.run(run_benchmark(args))
+        finally:
+            mock_push.terminate()
+            mock_push.wait()
+
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    # Numbers measured while log ingestion was failing are not comparable; make that visible to scripts and CI
+    log_errors = sum(result["log_ingestion"]["errors"] for result in report["results"])
+    if log_errors:
+        print(f"{log_errors} /logs/ requests failed during the benchmark", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import os
+import tempfile
+from py_vapid import Vapid01, b64urlencode
+
+# Configuration is read when `app` is imported, so point it at a throwaway SQLite database
+# and a freshly generated VAPID key before any test module imports it
+_vapid = Vapid01()
+_vapid.generate_keys()
+_workdir = tempfile.mkdtemp()
+os.environ.update({
+    "DATABASE_BACKEND": "sqlite",
+    "SQLITE_PATH": os.path.join(_workdir, "test.db"),
+    "API_KEY": "test",
+    "VAPID_PRIVATE_KEY": b64urlencode(_vapid.private_key.private_numbers().private_value.to_bytes(32, "big")),
+    "VAPID_PUBLIC_KEY": "test",
+    "VAPID_EMAIL": "test@example.com",
+})
@@ -0,0 +1,12 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils import vapid
+
+HEADERS = {"x-api-key": "test"}
+
+def test_app_starts_without_vapid_keys(monkeypatch):
+    # Only sending needs VAPID; logging and subscriptions must keep working without it
+    monkeypatch.setattr(vapid, "VAPID_PRIVATE_KEY", None)
+    with TestClient(app) as client:
+        response = client.post("/logs/", json={"level": "info", "message": "no vapid", "source": "client"}, headers=HEADERS)
+        assert response.status_code == 200
@@ -0,0 +1,58 @@
+import uuid
+from fastapi.testclient import TestClient
+from app.db.methods import get_subscriptions_by_device_ids
+from app.main import app
+from app.routers import subscriptions as subscriptions_router
+
+HEADERS = {"x-api-key": "test"}
+
+def item(device_id: str, endpoint: str):
+    return {"subscription": {"endpoint": endpoint, "keys": {"p256dh": "p", "auth": "a"}}, "device_id": device_id}
+
+def bulk(client, items):
+    response = client.post("/api/subscribe/bulk", json={"subscriptions": items}, headers=HEADERS)
+    assert response.status_code == 200
+    return response.json()
+
+def test_mixed_batch_reports_each_item_and_last_duplicate_wins():
+    run = uuid.uuid4().hex
+    shared = f"https://push.example.com/{run}/shared"
+    items = [
+        item(f"{run}-a", f"https://push.example.com/{run}/a"),
+        {"subscription": {"endpoint": f"https://push.example.com/{run}/bad"}, "device_id": f"{run}-bad"},
+        item(f"{run}-first", shared),
+        item(f"{run}-last", shared),
+    ]
+    with TestClient(app) as client:
+        body = bulk(client, items)
+        stored = client.portal.call(get_subscriptions_by_device_ids, [f"{run}-first", f"{run}-last"])
+
+    assert body["status_code"] == 207
+    assert [result["status"] for result in body["data"]["results"]] == ["subscribed", "invalid", "duplicate", "subscribed"]
+    assert body["data"]["summary"] == {"total": 4, "subscribed": 2, "invalid": 1, "duplicate": 1, "failed": 0}
+    # Like sequential upserts, the later item owns the shared endpoint
+    assert [row["device_id"] for row in stored] == [f"{run}-last"]
+
+def test_all_saved_is_201_and_all_invalid_is_400():
+    run = uuid.uuid4().hex
+    with TestClient(app) as client:
+        saved = bulk(client, [item(f"{run}-{i}", f"https://push.example.com/{run}/{i}") for i in range(3)])
+        invalid = bulk(client, [{"device_id": f"{run}-x"}, {"subscription": {}}])
+
+    assert saved["status_code"] == 201
+    assert saved["data"]["summary"]["subscribed"] == 3
+    assert invalid["status_code"] == 400
+    assert {result["status"] for result in invalid["data"]["results"]} == {"invalid"}
+
+def test_failed_chunks_are_reported_per_item(monkeypatch):
+    async def failing_add_subscriptions(subscription_requests):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(subscriptions_router, "add_subscriptions", failing_add_subscriptions)
+    run = uuid.uuid4().hex
+    with TestClient(app) as client:
+        body = bulk(client, [item(f"{run}-{i}", f"https://push.example.com/{run}/{i}") for i in range(2)])
+
+    assert body["status_code"] == 500
+    assert [result["status"] for result in body["data"]["results"]] == ["failed", "failed"]
+    assert "database down" in body["data"]["results"][0]["error"]
@@ -0,0 +1,42 @@
+import json
+import uuid
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.db.methods import insert_logs
+from app.main import app
+
+HEADERS = {"x-api-key": "test"}
+
+def test_pages_across_identical_timestamps_without_duplicates_or_gaps():
+    client_id = f"page-{uuid.uuid4().hex}"
+    timestamp = datetime.utcnow().isoformat()
+    # Enough rows that ids cross a digit boundary, all sharing one timestamp
+    rows = [
+        {"level": "info", "message": f"row {i}", "source": "client", "client_id": client_id, "timestamp": timestamp}
+        for i in range(12)
+    ]
+    with TestClient(app) as client:
+        inserted = client.portal.call(insert_logs, rows)
+        expected = sorted((row["id"] for row in inserted), key=int, reverse=True)
+
+        seen, cursor = [], None
+        while True:
+            params = {"client_id": client_id, "limit": 5, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/logs/", params=params, headers=HEADERS)
+            assert response.status_code == 200
+            seen.extend(row["id"] for row in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        exported = client.get("/logs/export", params={"client_id": client_id}, headers=HEADERS)
+        exported_ids = [json.loads(line)["id"] for line in exported.text.splitlines()]
+
+    assert seen == expected
+    assert exported_ids == expected
+
+def test_malformed_cursor_is_rejected():
+    with TestClient(app) as client:
+        for path in ("/logs/", "/logs/export"):
+            response = client.get(path, params={"cursor": "not-a-cursor"}, headers=HEADERS)
+            assert response.status_code == 400
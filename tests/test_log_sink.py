@@ -0,0 +1,154 @@
+import asyncio
+from app.utils.log_sink import LogSink
+
+class FakeWriter:
+    """Collects written batches; can be held back to let the queue fill up"""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, batch):
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("database down")
+        self.batches.append([entry["message"] for entry in batch])
+
+    @property
+    def messages(self):
+        return [message for batch in self.batches for message in batch]
+
+def entry(message: str, level: str = "info"):
+    return {"level": level, "message": message}
+
+def make_sink(writer, **settings) -> LogSink:
+    defaults = {"max_queue_size": 100, "batch_size": 100, "flush_interval": 10.0, "overflow_policy": "drop", "sample_rate": 0.0}
+    return LogSink(writer, **{**defaults, **settings})
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    async def scenario():
+        writer = FakeWriter()
+        sink = make_sink(writer, batch_size=3)
+        for i in range(3):
+            await sink.put(entry(f"m{i}"))
+        await asyncio.sleep(0.05)
+        batches = list(writer.batches)
+        await sink.close()
+        return batches
+
+    assert asyncio.run(scenario()) == [["m0", "m1", "m2"]]
+
+def test_partial_batch_is_written_after_the_flush_interval():
+    async def scenario():
+        writer = FakeWriter()
+        sink = make_sink(writer, flush_interval=0.05)
+        await sink.put(entry("only"))
+        await asyncio.sleep(0.01)
+        before = list(writer.batches)
+        await asyncio.sleep(0.1)
+        after = list(writer.batches)
+        await sink.close()
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before == []
+    assert after == [["only"]]
+
+def test_drop_policy_discards_rows_when_full():
+    async def scenario():
+        writer = FakeWriter()
+        sink = make_sink(writer, max_queue_size=2, overflow_policy="drop")
+        # put() does not yield while there is room, so the worker cannot drain in between
+        for i in range(5):
+            await sink.put(entry(f"m{i}"))
+        await sink.close()
+        return writer.messages, sink.get_stats()
+
+    messages, stats = asyncio.run(scenario())
+    assert messages == ["m0", "m1"]
+    assert stats["dropped"] == 3
+
+def test_sample_policy_keeps_errors_under_pressure():
+    async def scenario():
+        writer = FakeWriter()
+        sink = make_sink(writer, max_queue_size=4, overflow_policy="sample", sample_rate=0.0)
+        await sink.put(entry("info-1"))
+        await sink.put(entry("info-2"))
+        # Queue is half full: info rows are sampled out, errors still get in
+        await sink.put(entry("info-3"))
+        await sink.put(entry("error-1", level="error"))
+        await sink.put(entry("error-2", level="error"))
+        # Queue is full: even errors are dropped
+        await sink.put(entry("error-3", level="error"))
+        await sink.close()
+        return writer.messages, sink.get_stats()
+
+    messages, stats = asyncio.run(scenario())
+    assert messages == ["info-1", "info-2", "error-1", "error-2"]
+    assert stats["sampled_out"] == 1
+    assert stats["dropped"] == 1
+
+def test_block_policy_waits_for_room():
+    async def scenario():
+        writer = FakeWriter()
+        writer.release.clear()
+        sink = make_sink(writer, max_queue_size=1, batch_size=1, overflow_policy="block")
+        await sink.put(entry("m0"))
+        await asyncio.sleep(0.01)
+        # m0 is being written (and held); m1 fills the queue, so m2 has to wait
+        await sink.put(entry("m1"))
+        blocked = asyncio.create_task(sink.put(entry("m2")))
+        await asyncio.sleep(0.01)
+        was_blocked = not blocked.done()
+        writer.release.set()
+        await blocked
+        await sink.close()
+        return was_blocked, writer.messages, sink.get_stats()
+
+    was_blocked, messages, stats = asyncio.run(scenario())
+    assert was_blocked
+    assert messages == ["m0", "m1", "m2"]
+    assert stats["dropped"] == 0
+
+def test_close_drains_everything_still_queued():
+    async def scenario():
+        writer = FakeWriter()
+        sink = make_sink(writer, batch_size=2)
+        for i in range(5):
+            await sink.put(entry(f"m{i}"))
+        await sink.close()
+        return writer.messages, sink.get_stats()
+
+    messages, stats = asyncio.run(scenario())
+    assert messages == [f"m{i}" for i in range(5)]
+    assert stats["written"] == 5
+    assert stats["queue_depth"] == 0
+
+def test_failed_writes_are_counted():
+    async def scenario():
+        sink = make_sink(FakeWriter(fail=True))
+        await sink.put(entry("lost"))
+        await sink.close()
+        return sink.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1
+    assert stats["written"] == 0
+
+def test_sink_restarts_on_a_new_event_loop():
+    writer = FakeWriter()
+    sink = make_sink(writer)
+
+    async def leave_running():
+        await sink.put(entry("abandoned"))
+
+    async def restart():
+        await sink.put(entry("kept"))
+        await sink.close()
+
+    # The first loop ends without closing the sink
+    asyncio.run(leave_running())
+    asyncio.run(restart())
+    assert writer.messages == ["kept"]
@@ -0,0 +1,49 @@
+import asyncio
+from app.services import notification_service as service_module
+from app.services.notification_coalescer import NotificationCoalescer
+from app.services.notification_service import NotificationService
+from app.utils.logger import logger
+
+SUBSCRIPTION = {"id": 1, "device_id": "device-1", "endpoint": "https://push.example.com/1", "keys": {"p256dh": "p", "auth": "a"}}
+
+class FakeSender:
+    """Records the payloads that reach the push service"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_notification(self, subscription_info, data, subscription=None):
+        self.sent.append(data)
+        return True
+
+def test_newer_tagged_send_supersedes_the_held_one(monkeypatch):
+    monkeypatch.setattr(service_module, "notification_coalescer", NotificationCoalescer(window=0.1))
+
+    async def scenario():
+        service = NotificationService()
+        service.web_push_sender = sender = FakeSender()
+        try:
+            older = asyncio.create_task(service.send_to_subscription("device-1", SUBSCRIPTION, b"older", tag="score"))
+            await asyncio.sleep(0.02)
+            newer = asyncio.create_task(service.send_to_subscription("device-1", SUBSCRIPTION, b"newer", tag="score"))
+            return await older, await newer, sender.sent
+        finally:
+            await logger.close()
+
+    older, newer, sent = asyncio.run(scenario())
+    assert sent == [b"newer"]
+    assert older.success and older.superseded
+    assert newer.success and not newer.superseded
+
+def test_sends_outside_the_window_or_with_other_tags_are_not_coalesced():
+    async def scenario():
+        coalescer = NotificationCoalescer(window=0.05)
+        endpoint = SUBSCRIPTION["endpoint"]
+        first = await coalescer.hold(endpoint, "score")
+        # The window of the first send has closed, and other tags are held separately
+        second, third = await asyncio.gather(coalescer.hold(endpoint, "score"), coalescer.hold(endpoint, "chat"))
+        return first, second, third, coalescer.superseded
+
+    first, second, third, superseded = asyncio.run(scenario())
+    assert (first, second, third) == (True, True, True)
+    assert superseded == 0
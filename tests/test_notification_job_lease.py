@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.db.methods import connect_database, close_database, save_job, get_job
+from app.models.notification_job import NotificationJob, JobStatus
+from app.services.notification_jobs import NotificationJobManager, DatabaseJobStore
+
+class RecordingManager(NotificationJobManager):
+    """Records the jobs it would run instead of sending them"""
+
+    def __init__(self, started):
+        super().__init__(store=DatabaseJobStore(), workers=1)
+        self.started = started
+
+    async def _run(self, job):
+        self.started.append((self.owner, job.id))
+        self._active.pop(job.id, None)
+
+def test_only_jobs_with_expired_lease_are_resumed_once():
+    async def scenario():
+        await connect_database()
+        try:
+            alive = NotificationJob(
+                device_ids=[], payload={"title": "alive"}, status=JobStatus.RUNNING,
+                owner="peer", heartbeat_at=datetime.utcnow().isoformat()
+            )
+            orphaned = NotificationJob(
+                device_ids=[], payload={"title": "orphaned"}, status=JobStatus.RUNNING,
+                owner="gone", heartbeat_at=(datetime.utcnow() - timedelta(hours=1)).isoformat()
+            )
+            await save_job(alive.to_record())
+            await save_job(orphaned.to_record())
+
+            started = []
+            first, second = RecordingManager(started), RecordingManager(started)
+            await asyncio.gather(first.start(), second.start())
+            await asyncio.sleep(0.1)
+            await asyncio.gather(first.close(), second.close())
+
+            assert [job_id for _, job_id in started] == [orphaned.id]
+            assert (await get_job(alive.id))["owner"] == "peer"
+            assert (await get_job(orphaned.id))["owner"] == started[0][0]
+        finally:
+            await close_database()
+
+    asyncio.run(scenario())
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.db.methods import connect_database, close_database
+from app.models.scheduled_notification import ScheduleStatus
+from app.services import notification_scheduler as scheduler_module
+from app.services.notification_scheduler import NotificationScheduler
+from app.utils.logger import logger
+
+class FakeJob:
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+
+class FakeJobManager:
+    """Records released schedules instead of queueing notification jobs"""
+
+    def __init__(self):
+        self.submitted = []
+
+    async def submit(self, device_ids, payload):
+        self.submitted.append(payload["title"])
+        return FakeJob()
+
+@pytest.fixture
+def jobs(monkeypatch):
+    manager = FakeJobManager()
+    monkeypatch.setattr(scheduler_module, "notification_jobs", manager)
+    return manager
+
+def run(scenario):
+    async def with_database():
+        await connect_database()
+        try:
+            return await scenario()
+        finally:
+            await logger.close()
+            await close_database()
+
+    return asyncio.run(with_database())
+
+def in_seconds(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+def make_scheduler() -> NotificationScheduler:
+    return NotificationScheduler(release_rate=1000, release_burst=100)
+
+def test_schedules_are_released_in_send_at_order(jobs):
+    tag = uuid.uuid4().hex
+
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.schedule(["d"], {"title": f"{tag}-3"}, in_seconds(0.3))
+        await scheduler.schedule(["d"], {"title": f"{tag}-1"}, in_seconds(0.1))
+        await scheduler.schedule(["d"], {"title": f"{tag}-2"}, in_seconds(0.2))
+        await asyncio.sleep(0.6)
+        await scheduler.close()
+
+    run(scenario)
+    assert [title for title in jobs.submitted if title.startswith(tag)] == [f"{tag}-1", f"{tag}-2", f"{tag}-3"]
+
+def test_cancelled_schedule_is_not_released(jobs):
+    tag = uuid.uuid4().hex
+
+    async def scenario():
+        scheduler = make_scheduler()
+        schedule = await scheduler.schedule(["d"], {"title": tag}, in_seconds(0.2))
+        cancelled = await scheduler.cancel(schedule.id)
+        await asyncio.sleep(0.4)
+        again = await scheduler.cancel(schedule.id)
+        await scheduler.close()
+        return cancelled, again
+
+    cancelled, again = run(scenario)
+    assert cancelled.status == ScheduleStatus.CANCELLED
+    # A second cancel finds nothing left to claim and reports the schedule as it stands
+    assert again.status == ScheduleStatus.CANCELLED
+    assert tag not in jobs.submitted
+
+def test_schedule_is_released_once_by_competing_schedulers(jobs):
+    tag = uuid.uuid4().hex
+
+    async def scenario():
+        first, second = make_scheduler(), make_scheduler()
+        schedule = await first.schedule(["d"], {"title": tag}, in_seconds(0.2))
+        # The second instance loads the same pending schedule from the database
+        await second.start()
+        await asyncio.sleep(0.5)
+        await asyncio.gather(first.close(), second.close())
+        return await first.get(schedule.id), first.released + second.released
+
+    stored, released = run(scenario)
+    assert jobs.submitted.count(tag) == 1
+    assert released == 1
+    assert stored.status == ScheduleStatus.RELEASED
+    assert stored.job_id is not None
+
+def test_pending_schedules_are_reloaded_on_start(jobs):
+    tag = uuid.uuid4().hex
+
+    async def scenario():
+        stopped = make_scheduler()
+        await stopped.schedule(["d"], {"title": tag}, in_seconds(0.3))
+        await stopped.close()
+
+        restarted = make_scheduler()
+        await restarted.start()
+        assert restarted.get_stats()["pending"] >= 1
+        await asyncio.sleep(0.5)
+        await restarted.close()
+
+    run(scenario)
+    assert jobs.submitted.count(tag) == 1
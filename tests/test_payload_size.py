@@ -0,0 +1,33 @@
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.payload import MAX_PAYLOAD_BYTES, PayloadTooLargeError, render_payload
+
+HEADERS = {"x-api-key": "test"}
+
+def payload_of_size(size: int):
+    # {"title":""} is 12 bytes of compact JSON; the title fills the rest
+    return {"title": "x" * (size - 12)}
+
+def test_render_payload_accepts_exactly_the_limit():
+    data = render_payload(payload_of_size(MAX_PAYLOAD_BYTES))
+    assert len(data) == MAX_PAYLOAD_BYTES
+
+def test_render_payload_rejects_one_byte_over_the_limit():
+    with pytest.raises(PayloadTooLargeError):
+        render_payload(payload_of_size(MAX_PAYLOAD_BYTES + 1))
+
+def test_notify_rejects_oversized_payload_with_413():
+    device_id = f"size-{uuid.uuid4().hex}"
+    with TestClient(app) as client:
+        too_large = client.post("/api/notify", json={
+            "payload": payload_of_size(MAX_PAYLOAD_BYTES + 1), "device_ids": [device_id]
+        }, headers=HEADERS)
+        at_limit = client.post("/api/notify", json={
+            "payload": payload_of_size(MAX_PAYLOAD_BYTES), "device_ids": [device_id]
+        }, headers=HEADERS)
+
+    assert too_large.status_code == 413
+    assert too_large.json()["status_code"] == 413
+    assert at_limit.status_code != 413
@@ -0,0 +1,151 @@
+import asyncio
+import base64
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from pywebpush import WebPushException
+from app.services.rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+from app.services.webpush_service import WebPushSender, RetryScheduled
+
+ENDPOINT = "https://push.example.com/send/1"
+
+def make_subscription_info():
+    receiver = ec.generate_private_key(ec.SECP256R1())
+    p256dh = receiver.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+    return {
+        "endpoint": ENDPOINT,
+        "keys": {
+            "p256dh": base64.urlsafe_b64encode(p256dh).decode().rstrip("="),
+            "auth": base64.urlsafe_b64encode(os.urandom(16)).decode().rstrip("="),
+        },
+    }
+
+class FakePushService:
+    """Answers sends with the given (status, headers) responses in order"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = 0
+
+    async def post(self, url, content, headers):
+        self.requests += 1
+        status, response_headers = self.responses.pop(0)
+        return httpx.Response(status, headers=response_headers, request=httpx.Request("POST", url))
+
+    async def close(self):
+        pass
+
+def make_sender(*responses, inline_max_delay: float = 60.0) -> WebPushSender:
+    sender = WebPushSender()
+    sender.connection_pool = FakePushService(*responses)
+    sender.retry_base_delay = 0.01
+    sender.retry_max_delay = 5
+    sender.retry_inline_max_delay = inline_max_delay
+    return sender
+
+def test_token_bucket_spaces_sends_beyond_the_burst():
+    async def scenario():
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started, bucket.waits
+
+    elapsed, waits = asyncio.run(scenario())
+    # Two slots come from the burst, the next two 1/20 s apart
+    assert waits == 2
+    assert 0.08 <= elapsed < 0.5
+
+def test_token_bucket_pause_holds_back_every_sender():
+    async def scenario():
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.pause(0.1)
+        assert 0.05 < bucket.paused_for() <= 0.1
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started, bucket.pauses
+
+    elapsed, pauses = asyncio.run(scenario())
+    assert elapsed >= 0.09
+    assert pauses == 1
+
+def test_backoff_delay_is_jittered_and_capped():
+    for attempt in range(6):
+        for _ in range(50):
+            delay = backoff_delay(attempt, base=0.5, maximum=4)
+            assert 0 <= delay <= min(4, 0.5 * 2 ** attempt)
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(retry_at) <= 30
+
+def test_server_error_is_retried():
+    async def scenario():
+        sender = make_sender((503, {}), (201, {}))
+        assert await sender.send_notification(make_subscription_info(), b"hello") is True
+        return sender
+
+    sender = asyncio.run(scenario())
+    assert sender.connection_pool.requests == 2
+    assert sender.retries == 1
+
+def test_retries_are_exhausted():
+    async def scenario():
+        sender = make_sender(*[(500, {})] * 4)
+        with pytest.raises(WebPushException):
+            await sender.send_notification(make_subscription_info(), b"hello")
+        return sender
+
+    sender = asyncio.run(scenario())
+    assert sender.connection_pool.requests == sender.max_retries + 1
+    assert sender.retries_exhausted == 1
+
+def test_throttled_send_pauses_the_origin_and_retries():
+    async def scenario():
+        sender = make_sender((429, {"retry-after": "0.05"}), (201, {}))
+        started = time.monotonic()
+        assert await sender.send_notification(make_subscription_info(), b"hello") is True
+        return sender, time.monotonic() - started
+
+    sender, elapsed = asyncio.run(scenario())
+    assert elapsed >= 0.04
+    assert sender.get_stats()["rate_limits"]["https://push.example.com"]["pauses"] == 1
+
+def test_long_retry_after_pauses_the_origin_without_retrying():
+    async def scenario():
+        sender = make_sender((429, {"retry-after": "120"}))
+        with pytest.raises(WebPushException):
+            await sender.send_notification(make_subscription_info(), b"hello")
+        return sender
+
+    sender = asyncio.run(scenario())
+    assert sender.connection_pool.requests == 1
+    assert sender.get_stats()["rate_limits"]["https://push.example.com"]["paused_for_seconds"] > 100
+
+def test_long_backoff_is_handed_to_the_retry_scheduler():
+    async def scenario():
+        sender = make_sender((503, {"retry-after": "0.05"}), (201, {}), inline_max_delay=0)
+        started = time.monotonic()
+        with pytest.raises(RetryScheduled):
+            await sender.send_notification(make_subscription_info(), b"hello")
+        # The caller got control back right away; the retry runs in the background
+        returned_after = time.monotonic() - started
+        await asyncio.sleep(0.2)
+        stats = sender.retry_scheduler.get_stats()
+        await sender.close()
+        return returned_after, stats
+
+    returned_after, stats = asyncio.run(scenario())
+    assert returned_after < 0.05
+    assert stats["scheduled"] == 1
+    assert stats["succeeded"] == 1
+    assert stats["pending"] == 0
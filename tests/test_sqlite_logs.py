@@ -0,0 +1,32 @@
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.log_rollups import LogRollups
+
+HEADERS = {"x-api-key": "test"}
+
+def test_post_log_on_sqlite_returns_string_id():
+    with TestClient(app) as client:
+        response = client.post(
+            "/logs/",
+            json={"level": "info", "message": "hello from the test", "source": "client", "client_id": "string-id-test", "metadata": {"test": True}},
+            headers=HEADERS
+        )
+        assert response.status_code == 200
+        log_id = response.json()["log_id"]
+        assert isinstance(log_id, str)
+
+        logs = client.get("/logs/", params={"client_id": "string-id-test"}, headers=HEADERS).json()
+        assert [log["id"] for log in logs] == [log_id]
+
+
+def test_log_stats_are_persisted_across_restarts():
+    with TestClient(app) as client:
+        client.post("/logs/", json={"level": "warn", "message": "counted", "source": "client"}, headers=HEADERS)
+        counted = client.get("/logs/stats", params={"hours": 1}, headers=HEADERS).json()["by_level"]["warn"]
+        assert counted >= 1
+
+    # A fresh process, with no counts of its own in memory, answers from the rollups table
+    with TestClient(app) as client:
+        stats = client.portal.call(LogRollups().get_stats, timedelta(hours=1))
+        assert stats["by_level"]["warn"] == counted
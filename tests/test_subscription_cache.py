@@ -0,0 +1,73 @@
+import uuid
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import subscription_cache as cache_module
+from app.services.subscription_cache import SubscriptionCache, subscription_cache
+from app.services.subscription_pruner import SubscriptionPruner
+from app.services.subscription_service import SubscriptionLookupService
+
+HEADERS = {"x-api-key": "test"}
+
+def sub(endpoint: str, device_id: str, subscription_id: int = 1):
+    return {"id": subscription_id, "endpoint": endpoint, "device_id": device_id, "keys": {}}
+
+def test_least_recently_used_device_is_evicted():
+    cache = SubscriptionCache(max_size=2, ttl=60)
+    cache.set("a", [sub("https://push/a", "a")])
+    cache.set("b", [sub("https://push/b", "b")])
+    cache.get("a")
+    cache.set("c", [sub("https://push/c", "c")])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.evictions == 1
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = SubscriptionCache(max_size=10, ttl=30)
+    cache.set("a", [])
+    now[0] += 29
+    assert cache.get("a") == []
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+def test_upsert_writes_through_to_cached_device():
+    cache = SubscriptionCache(max_size=10, ttl=60)
+    cache.set("a", [sub("https://push/1", "a")])
+    updated = {**sub("https://push/1", "a"), "keys": {"auth": "new"}}
+    cache.upsert_subscription(updated)
+    cache.upsert_subscription(sub("https://push/2", "a", 2))
+    assert cache.get("a") == [updated, sub("https://push/2", "a", 2)]
+    # Devices that are not cached stay uncached; the next lookup loads them
+    cache.upsert_subscription(sub("https://push/3", "b", 3))
+    assert cache.get("b") is None
+
+def test_endpoint_moving_to_another_device_invalidates_its_old_owner():
+    cache = SubscriptionCache(max_size=10, ttl=60)
+    cache.set("old", [sub("https://push/shared", "old")])
+    cache.upsert_subscription(sub("https://push/shared", "new"))
+    assert cache.get("old") is None
+
+def test_unsubscribe_and_prune_invalidate_cached_devices():
+    first, second = f"cache-{uuid.uuid4().hex}", f"cache-{uuid.uuid4().hex}"
+    with TestClient(app) as client:
+        for device_id in (first, second):
+            response = client.post("/api/subscribe", json={
+                "subscription": {"endpoint": f"https://push.example.com/{device_id}", "keys": {"p256dh": "p", "auth": "a"}},
+                "device_id": device_id
+            }, headers=HEADERS)
+            assert response.status_code < 300
+
+        lookup = SubscriptionLookupService()
+        client.portal.call(lookup.load_device_subscriptions, [first, second])
+        assert subscription_cache.get(first) and subscription_cache.get(second)
+
+        client.post("/api/unsubscribe", json={"device_ids": [first]}, headers=HEADERS)
+        assert subscription_cache.get(first) is None
+
+        pruner = SubscriptionPruner(enabled=True)
+        pruner.mark(subscription_cache.get(second)[0], "gone")
+        client.portal.call(pruner.flush)
+        assert subscription_cache.get(second) is None